@@ -0,0 +1,150 @@
+"""
+Sorted-prefix index for search-box autocomplete over product names.
+
+Every name is stored as (key, entry) pairs in lists sorted by key, bucketed by
+the key's first character, so the completions of a prefix are one contiguous
+range found with two binary searches. Keys go through the same normalization
+as the search index, and each name is also stored from every word boundary so
+"leat" completes "Luxury Leather Bag". Short prefixes match large ranges, so
+the best completions of wide ranges are cached and kept current on upserts.
+"""
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from search_index import index_terms, tokenize, unfinished_article_stem
+
+# Completions returned per prefix; also the upper bound for `limit`
+MAX_SUGGESTIONS = 10
+
+SUGGEST_FIELDS = ("name", "nameEn")
+
+# Ranges longer than this keep their best completions cached
+CACHED_RANGE_SIZE = 256
+
+# Sorts after every character, so key + PREFIX_END bounds the keys starting with key
+PREFIX_END = "\U0010ffff"
+
+# (starts mid-name, display length, display text, product id) - smaller is better
+Entry = Tuple[bool, int, str, int]
+
+
+def _product_keys(product: dict) -> List[Tuple[str, Entry]]:
+    keys = []
+    for field in SUGGEST_FIELDS:
+        text = product.get(field) or ""
+        terms = index_terms(text)
+        tokens = [token for token, _ in terms]
+        for start, (token, raw) in enumerate(terms):
+            entry = (start > 0, len(text), text, product["id"])
+            rest = tokens[start + 1:]
+            keys.append((" ".join([token] + rest), entry))
+            if raw != token:
+                # "ال" and "الح" are prefixes of the article form only
+                keys.append((" ".join([raw] + rest), entry))
+    return keys
+
+
+class SuggestionIndex:
+    def __init__(self, products: Iterable[dict] = ()):
+        self._product_keys: Dict[int, List[Tuple[str, Entry]]] = {}
+        buckets: Dict[str, List[Tuple[str, Entry]]] = defaultdict(list)
+        for product in products:
+            keys = self._product_keys[product["id"]] = _product_keys(product)
+            for key, entry in keys:
+                buckets[key[0]].append((key, entry))
+
+        # Parallel lists per first character: keys sorted, entries in the same order
+        self._keys: Dict[str, List[str]] = {}
+        self._entries: Dict[str, List[Entry]] = {}
+        # prefix -> best completions, for prefixes matching more than CACHED_RANGE_SIZE keys
+        self._top: Dict[str, List[Entry]] = {}
+        for first, pairs in buckets.items():
+            pairs.sort()
+            self._keys[first] = [key for key, _ in pairs]
+            self._entries[first] = [entry for _, entry in pairs]
+            # One-character prefixes are the widest ranges; warm them here rather than on a keystroke
+            if len(pairs) > CACHED_RANGE_SIZE:
+                self._top[first] = heapq.nsmallest(MAX_SUGGESTIONS, self._entries[first])
+
+    def __len__(self) -> int:
+        return len(self._product_keys)
+
+    # ---------- maintenance ----------
+
+    def upsert(self, product: dict) -> None:
+        self.remove(product["id"])
+        keys = self._product_keys[product["id"]] = _product_keys(product)
+        for key, entry in keys:
+            first = key[0]
+            bucket_keys = self._keys.setdefault(first, [])
+            entries = self._entries.setdefault(first, [])
+            lo = bisect_left(bucket_keys, key)
+            i = bisect_left(entries, entry, lo, bisect_right(bucket_keys, key, lo))
+            bucket_keys.insert(i, key)
+            entries.insert(i, entry)
+            for top in self._cached_tops(key):
+                if len(top) < MAX_SUGGESTIONS or entry < top[-1]:
+                    insort(top, entry)
+                    del top[MAX_SUGGESTIONS:]
+
+    def remove(self, product_id: int) -> None:
+        for key, entry in self._product_keys.pop(product_id, ()):
+            bucket_keys = self._keys[key[0]]
+            entries = self._entries[key[0]]
+            lo = bisect_left(bucket_keys, key)
+            hi = bisect_right(bucket_keys, key, lo)
+            i = bisect_left(entries, entry, lo, hi)
+            if i < hi and entries[i] == entry:
+                del bucket_keys[i]
+                del entries[i]
+                # Recomputed on the next keystroke that needs them
+                for end in range(1, len(key) + 1):
+                    if entry in self._top.get(key[:end], ()):
+                        del self._top[key[:end]]
+
+    def _cached_tops(self, key: str) -> Iterable[List[Entry]]:
+        # Only cached prefixes of a changed key can have different completions
+        for end in range(1, len(key) + 1):
+            top = self._top.get(key[:end])
+            if top is not None:
+                yield top
+
+    # ---------- queries ----------
+
+    def _best(self, key: str) -> List[Entry]:
+        top = self._top.get(key)
+        if top is not None:
+            return top
+        keys = self._keys.get(key[0])
+        if not keys:
+            return []
+        lo = bisect_left(keys, key)
+        hi = bisect_left(keys, key + PREFIX_END, lo)
+        top = heapq.nsmallest(MAX_SUGGESTIONS, self._entries[key[0]][lo:hi])
+        if hi - lo > CACHED_RANGE_SIZE:
+            self._top[key] = top
+        return top
+
+    def suggest(self, prefix: str, limit: int = MAX_SUGGESTIONS) -> List[dict]:
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+
+        best = self._best(" ".join(tokens))
+        stem = unfinished_article_stem(prefix)
+        if stem is not None:
+            # "الح" also completes names written without the article
+            best = heapq.merge(best, self._best(" ".join(tokens[:-1] + [stem])))
+
+        suggestions = []
+        seen = set()
+        for _, _, text, product_id in best:
+            if text in seen:
+                continue
+            seen.add(text)
+            suggestions.append({"text": text, "product_id": product_id})
+            if len(suggestions) >= limit:
+                break
+        return suggestions
@@ -0,0 +1,116 @@
+"""
+In-process dispatch of /api/batch sub-requests.
+
+Each sub-request is run straight through the API router as its own ASGI
+call, without a new HTTP round trip or the app middleware. Consecutive reads
+run concurrently; a write waits for everything before it and blocks
+everything after it, so results match running the calls in order.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from starlette.exceptions import HTTPException
+
+READ_METHODS = {"GET", "HEAD"}
+
+# Request headers carried over from the batch request to every sub-request;
+# X-Forwarded-For keeps per-IP rate limits keyed on the caller, not the ingress
+FORWARDED_HEADERS = {b"authorization", b"accept-language", b"user-agent", b"x-forwarded-for"}
+
+# Sub-response headers returned with each result, e.g. Retry-After on a 429
+RETURNED_HEADERS = {"retry-after", "etag", "cache-control"}
+
+logger = logging.getLogger(__name__)
+
+
+async def dispatch(
+    asgi_app,
+    parent_scope: dict,
+    method: str,
+    path: str,
+    body: Optional[Any],
+    state: Dict[str, Any],
+) -> dict:
+    path, _, query_string = path.partition("?")
+    payload = b"" if body is None else json.dumps(body).encode()
+    headers = [(k, v) for k, v in parent_scope["headers"] if k in FORWARDED_HEADERS]
+    headers.append((b"accept", b"application/json"))
+    if payload:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+
+    scope = {
+        **parent_scope,
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "headers": headers,
+        "state": {**parent_scope.get("state", {}), **state},
+    }
+    scope.pop("route", None)
+    scope.pop("endpoint", None)
+
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            return {"type": "http.disconnect"}
+        request_sent = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    response: Dict[str, Any] = {"status": 500, "headers": {}}
+    chunks: List[bytes] = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await asgi_app(scope, receive, send)
+    except HTTPException as e:
+        # Raised by the router itself, e.g. for an unknown path
+        return {"status": e.status_code, "headers": _returned_headers(e.headers or {}), "body": {"detail": e.detail}}
+    except Exception as e:
+        logger.error(f"Batch sub-request {method} {path} failed: {str(e)}")
+        return {"status": 500, "headers": {}, "body": {"detail": "Internal Server Error"}}
+
+    raw = b"".join(chunks)
+    content_type = response["headers"].get("content-type", "")
+    if raw and content_type.startswith("application/json"):
+        body = json.loads(raw)
+    else:
+        body = raw.decode(errors="replace") or None
+    return {"status": response["status"], "headers": _returned_headers(response["headers"]), "body": body}
+
+
+def _returned_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    return {k.lower(): v for k, v in headers.items() if k.lower() in RETURNED_HEADERS}
+
+
+async def run_batch(asgi_app, parent_scope: dict, calls: List[dict], state: Dict[str, Any]) -> List[dict]:
+    results: List[Optional[dict]] = [None] * len(calls)
+    reads: List[int] = []
+
+    async def flush_reads():
+        responses = await asyncio.gather(*[
+            dispatch(asgi_app, parent_scope, calls[i]["method"], calls[i]["path"], calls[i].get("body"), state)
+            for i in reads
+        ])
+        for i, result in zip(reads, responses):
+            results[i] = result
+        reads.clear()
+
+    for i, call in enumerate(calls):
+        if call["method"] in READ_METHODS:
+            reads.append(i)
+            continue
+        await flush_reads()
+        results[i] = await dispatch(asgi_app, parent_scope, call["method"], call["path"], call.get("body"), state)
+    await flush_reads()
+    return results
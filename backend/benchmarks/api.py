@@ -0,0 +1,242 @@
+"""
+In-process load test of the API routes.
+
+Drives `server.app` through httpx's ASGI transport against the stand-ins in
+benchmarks/harness.py and reports throughput and p50/p95/p99 latency per
+route. Baselines are machine-specific: save one, then compare later runs on
+the same machine; a route whose p95 grows or whose throughput drops by more
+than --tolerance fails the comparison.
+
+    python -m benchmarks.api --save-baseline benchmarks/baselines/api.json
+    python -m benchmarks.api --compare benchmarks/baselines/api.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.harness import load_server
+
+SEARCH_QUERIES = ["bag", "حقيبة", "leather jacket", "قميص", "summer", "lether", "polo"]
+CHECKOUT_ITEM = {"product_id": 1, "name": "Luxury Leather Bag", "price": 1299, "quantity": 1, "size": "M"}
+WISHLIST_ITEM = {"product_id": 1, "name": "Luxury Leather Bag", "price": 1299, "image": "https://example.com/1.jpg"}
+WISHLIST_SCENARIOS = ("wishlist_get", "wishlist_add")
+
+
+class Scenario:
+    def __init__(self, name: str, method: str, request: Callable[[int], dict], max_requests: Optional[int] = None):
+        """`request(i)` returns the path plus any httpx kwargs for the i-th call."""
+        self.name = name
+        self.method = method
+        self.request = request
+        # bcrypt routes cost ~100x more than the rest; cap them so a run stays short
+        self.max_requests = max_requests
+
+
+def scenarios(token: str, session_ids: List[str], product_ids: List[int]) -> List[Scenario]:
+    auth = {"Authorization": f"Bearer {token}"}
+    queries = itertools.cycle(SEARCH_QUERIES)
+    products = itertools.cycle(product_ids)
+    sessions = itertools.cycle(session_ids)
+    return [
+        Scenario("search", "GET", lambda i: {"url": "/api/products/search", "params": {"q": next(queries)}}),
+        Scenario("suggest", "GET", lambda i: {"url": "/api/products/suggest", "params": {"q": next(queries)[:3]}}),
+        Scenario("product_detail", "GET", lambda i: {"url": f"/api/products/{next(products)}"}),
+        Scenario("products_list", "GET", lambda i: {"url": "/api/products", "params": {"category": "bags"}}),
+        Scenario("categories", "GET", lambda i: {"url": "/api/categories"}),
+        Scenario("auth_me", "GET", lambda i: {"url": "/api/auth/me", "headers": auth}),
+        Scenario("auth_login", "POST", lambda i: {
+            "url": "/api/auth/login", "json": {"email": "bench@7777.com", "password": "bench-password"},
+        }, max_requests=50),
+        Scenario("auth_register", "POST", lambda i: {
+            "url": "/api/auth/register",
+            "json": {"email": f"bench_{uuid.uuid4().hex[:12]}@7777.com", "password": "bench-password", "name": "Bench"},
+        }, max_requests=50),
+        Scenario("wishlist_get", "GET", lambda i: {"url": "/api/wishlist", "headers": auth}),
+        Scenario("wishlist_add", "POST", lambda i: {
+            "url": "/api/wishlist/add", "headers": auth,
+            "json": {"product_id": next(products), "name": "Bench", "price": 299, "image": "https://example.com/x.jpg"},
+        }),
+        Scenario("orders", "GET", lambda i: {"url": "/api/orders", "headers": auth, "params": {"limit": 20}}),
+        Scenario("checkout_create", "POST", lambda i: {
+            "url": "/api/checkout/create-session", "headers": auth,
+            "json": {"origin_url": "http://bench.local", "items": [CHECKOUT_ITEM]},
+        }),
+        Scenario("checkout_status", "GET", lambda i: {"url": f"/api/checkout/status/{next(sessions)}"}),
+    ]
+
+
+async def seed(server, client: httpx.AsyncClient, orders: int) -> dict:
+    response = await client.post("/api/auth/register", json={
+        "email": "bench@7777.com", "password": "bench-password", "name": "Bench User",
+    })
+    response.raise_for_status()
+    data = response.json()
+    user_id, token = data["user"]["id"], data["access_token"]
+
+    now = datetime.now(timezone.utc)
+    await server.app.state.services.db.orders.insert_many([{
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "session_id": f"cs_bench_seed_{i}",
+        "items": [CHECKOUT_ITEM] * 4,
+        "total": 1493.85,
+        "currency": "SAR",
+        "status": "paid",
+        "payment_status": "paid",
+        "created_at": (now - timedelta(minutes=i)).isoformat(),
+        "updated_at": (now - timedelta(minutes=i)).isoformat(),
+    } for i in range(orders)])
+
+    session_ids = []
+    for _ in range(5):
+        response = await client.post(
+            "/api/checkout/create-session",
+            headers={"Authorization": f"Bearer {token}"},
+            json={"origin_url": "http://bench.local", "items": [CHECKOUT_ITEM]},
+        )
+        response.raise_for_status()
+        session_ids.append(response.json()["session_id"])
+    return {"token": token, "session_ids": session_ids}
+
+
+async def wishlist_stand_in_issue(client: httpx.AsyncClient, token: str) -> Optional[str]:
+    """Why the wishlist routes can't be measured on the MongoDB stand-in, if they can't.
+
+    add_to_wishlist is an update-pipeline upsert, which mongomock only partly
+    evaluates; timing a path that stores the wrong document would be meaningless.
+    """
+    auth = {"Authorization": f"Bearer {token}"}
+    for _ in range(2):
+        (await client.post("/api/wishlist/add", headers=auth, json=WISHLIST_ITEM)).raise_for_status()
+    response = await client.get("/api/wishlist", headers=auth)
+    response.raise_for_status()
+    stored = response.json()["items"]
+    (await client.delete(f"/api/wishlist/{WISHLIST_ITEM['product_id']}", headers=auth)).raise_for_status()
+    if stored != [WISHLIST_ITEM]:
+        return f"adding {WISHLIST_ITEM['product_id']} twice stored {stored}"
+    return None
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            kwargs = scenario.request(i)
+            start = time.perf_counter()
+            response = await client.request(scenario.method, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+async def run(args) -> Dict[str, dict]:
+    server = load_server(stripe_latency=args.stripe_latency_ms / 1000)
+    from rate_limit import BucketRule
+
+    # Measure the routes, not the login limiter
+    for name in server.AUTH_RATE_LIMITS:
+        server.AUTH_RATE_LIMITS[name] = BucketRule(capacity=10 ** 9, per_seconds=1)
+
+    transport = httpx.ASGITransport(app=server.app)
+    await server.app.router.startup()
+    await server.app.state.warm_up.wait()
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench.local") as client:
+            fixtures = await seed(server, client, args.orders)
+            product_ids = server.app.state.services.catalog_cache.catalog.product_ids()
+            wishlist_issue = await wishlist_stand_in_issue(client, fixtures["token"])
+            results = {}
+            for scenario in scenarios(fixtures["token"], fixtures["session_ids"], product_ids):
+                if args.only and scenario.name not in args.only:
+                    continue
+                if wishlist_issue and scenario.name in WISHLIST_SCENARIOS:
+                    print(f"{scenario.name:<18}skipped: the MongoDB stand-in mishandles this route ({wishlist_issue})")
+                    continue
+                requests = min(args.requests, scenario.max_requests or args.requests)
+                await run_scenario(client, scenario, min(args.warmup, requests), args.concurrency)
+                results[scenario.name] = await run_scenario(client, scenario, requests, args.concurrency)
+                r = results[scenario.name]
+                print(f"{scenario.name:<18}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}")
+            return results
+    finally:
+        await server.app.router.shutdown()
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    regressions = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['rps']} -> {current['rps']} req/s")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per route first")
+    parser.add_argument("--orders", type=int, default=200, help="Orders seeded for the benchmark user")
+    parser.add_argument("--stripe-latency-ms", type=float, default=0.0, help="Simulated Stripe round trip")
+    parser.add_argument("--only", nargs="*", help="Run only these routes")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    parser.add_argument("--save-baseline", help="Write the results as a baseline")
+    parser.add_argument("--compare", help="Fail if results regress against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    print(f"{'route':<18}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    results = asyncio.run(run(args))
+
+    for path in (args.json_path, args.save_baseline):
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_text(json.dumps(results, indent=2))
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.compare).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Shared set-up for the benchmarks: `server` running on an in-memory MongoDB
+stand-in (mongomock-motor) with StripeCheckout stubbed out, so nothing leaves
+the process and results don't depend on a database or on Stripe.
+"""
+import asyncio
+import os
+import sys
+import types
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+class CheckoutSessionRequest(BaseModel):
+    amount: float
+    currency: str
+    success_url: str
+    cancel_url: str
+    metadata: Optional[Dict[str, str]] = None
+
+
+class CheckoutSessionResponse(BaseModel):
+    url: str
+    session_id: str
+
+
+class CheckoutStatusResponse(BaseModel):
+    status: str
+    payment_status: str
+    amount_total: int
+    currency: str
+    metadata: Dict[str, str]
+
+
+class WebhookResponse(BaseModel):
+    event_type: str
+    event_id: str
+    session_id: str
+    payment_status: str
+
+
+class StubStripeCheckout:
+    """Answers like emergentintegrations' StripeCheckout after `latency` seconds."""
+
+    latency = 0.0
+
+    def __init__(self, api_key: str, webhook_url: str):
+        self.api_key = api_key
+        self.webhook_url = webhook_url
+
+    async def create_checkout_session(self, request: CheckoutSessionRequest) -> CheckoutSessionResponse:
+        await asyncio.sleep(self.latency)
+        session_id = f"cs_bench_{uuid.uuid4().hex}"
+        return CheckoutSessionResponse(url=f"https://checkout.stripe.test/{session_id}", session_id=session_id)
+
+    async def get_checkout_status(self, session_id: str) -> CheckoutStatusResponse:
+        await asyncio.sleep(self.latency)
+        return CheckoutStatusResponse(
+            status="complete", payment_status="paid", amount_total=129900, currency="sar", metadata={},
+        )
+
+    async def handle_webhook(self, body: bytes, signature: Optional[str]) -> WebhookResponse:
+        await asyncio.sleep(self.latency)
+        return WebhookResponse(
+            event_type="checkout.session.completed",
+            event_id=f"evt_bench_{uuid.uuid4().hex}",
+            session_id=f"cs_bench_{uuid.uuid4().hex}",
+            payment_status="paid",
+        )
+
+
+def install_stand_ins(stripe_latency: float = 0.0) -> None:
+    """Route Motor to mongomock and StripeCheckout to the stub; call before importing server."""
+    import motor.motor_asyncio
+    from mongomock_motor import AsyncMongoMockClient
+
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+    StubStripeCheckout.latency = stripe_latency
+    checkout = types.ModuleType("emergentintegrations.payments.stripe.checkout")
+    checkout.StripeCheckout = StubStripeCheckout
+    checkout.CheckoutSessionRequest = CheckoutSessionRequest
+    checkout.CheckoutSessionResponse = CheckoutSessionResponse
+    checkout.CheckoutStatusResponse = CheckoutStatusResponse
+    for name in ("emergentintegrations", "emergentintegrations.payments", "emergentintegrations.payments.stripe"):
+        sys.modules[name] = types.ModuleType(name)
+    sys.modules[checkout.__name__] = checkout
+
+    os.environ["MONGO_URL"] = "mongodb://stand-in"
+    os.environ.setdefault("DB_NAME", "bench")
+    os.environ.setdefault("STRIPE_API_KEY", "sk_test_bench")
+
+
+def load_server(stripe_latency: float = 0.0):
+    install_stand_ins(stripe_latency)
+    import server
+    from db_indexes import ensure_indexes
+
+    # mongomock can't explain queries, so only create the indexes
+    server.bootstrap_indexes = ensure_indexes
+    return server
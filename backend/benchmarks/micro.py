@@ -0,0 +1,215 @@
+"""
+Microbenchmarks for the auth and search hot paths, measured in isolation.
+
+Covers create_access_token, jwt.decode and get_current_user (cached user),
+get_password_hash/verify_password, and search_products over synthetic
+catalogs of the given sizes, next to the original linear scan it replaced.
+Results go to JSON so runs before and after a change can be compared:
+
+    python -m benchmarks.micro --sizes 1000 10000 100000 --json before.json
+    python -m benchmarks.micro --sizes 1000 10000 100000 --compare before.json
+
+Building the search index takes about a second per 10k SKUs, so 1M-SKU runs
+(--sizes 1000000) need a few minutes and several GB of memory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.harness import BACKEND_DIR, load_server
+from benchmarks.synthetic import CATEGORIES, QUERIES, generate_catalog
+
+# Each timed batch runs at least this long, so short calls are averaged over many
+MIN_BATCH_SECONDS = 0.05
+
+
+def measure(fn: Callable[[], object], repeat: int) -> dict:
+    def run_batch(number: int) -> float:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - start
+
+    number = 1
+    while number < 1_000_000 and run_batch(number) < MIN_BATCH_SECONDS:
+        number *= 10
+    return _summary([run_batch(number) / number for _ in range(repeat)], number * repeat)
+
+
+async def ameasure(fn: Callable[[], Awaitable[object]], repeat: int) -> dict:
+    async def run_batch(number: int) -> float:
+        start = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        return time.perf_counter() - start
+
+    number = 1
+    while number < 1_000_000 and await run_batch(number) < MIN_BATCH_SECONDS:
+        number *= 10
+    return _summary([await run_batch(number) / number for _ in range(repeat)], number * repeat)
+
+
+def _summary(per_call: List[float], calls: int) -> dict:
+    return {
+        "best_us": round(min(per_call) * 1e6, 3),
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "calls": calls,
+    }
+
+
+def linear_scan(products: List[dict], q: str, category: Optional[str] = None) -> dict:
+    # search_products as it was before the index: substring match over every product
+    results = []
+    query_lower = q.lower()
+    for product in products:
+        if query_lower and query_lower not in product["name"].lower() and query_lower not in product["nameEn"].lower():
+            continue
+        if category and product["category"] != category:
+            continue
+        results.append(product)
+    return {"products": results, "total": len(results)}
+
+
+class Recorder:
+    def __init__(self):
+        self.results: List[dict] = []
+
+    def add(self, name: str, params: Dict[str, object], timing: dict) -> None:
+        self.results.append({"name": name, "params": params, **timing})
+        label = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{name:<26}{label:<34}{timing['best_us']:>14.2f}{timing['median_us']:>14.2f}")
+
+
+async def bench_auth(server, recorder: Recorder, repeat: int) -> None:
+    from fastapi import Request
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    services = server.app.state.services
+    user_id = "bench-user"
+    await services.db.users.insert_one({"id": user_id, "email": "bench@7777.com", "name": "Bench"})
+    token = server.create_access_token(data={"sub": user_id})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    request = Request({"type": "http", "method": "GET", "path": "/api/auth/me", "headers": [], "app": server.app})
+
+    recorder.add("create_access_token", {}, measure(lambda: server.create_access_token(data={"sub": user_id}), repeat))
+    recorder.add("jwt.decode", {}, measure(
+        lambda: server.jwt.decode(token, server.SECRET_KEY, algorithms=[server.ALGORITHM]), repeat,
+    ))
+    await server.get_current_user(request, credentials)
+    recorder.add("get_current_user", {"cache": "hit"}, await ameasure(
+        lambda: server.get_current_user(request, credentials), repeat,
+    ))
+
+    # bcrypt runs on the hasher's thread pool, as in the routes
+    hasher = services.password_hasher
+    hashed = await server.get_password_hash(hasher, "bench-password")
+    rounds = services.pwd_context.handler("bcrypt").from_string(hashed).rounds
+    recorder.add("get_password_hash", {"rounds": rounds}, await ameasure(
+        lambda: server.get_password_hash(hasher, "bench-password"), repeat,
+    ))
+    recorder.add("verify_password", {"rounds": rounds}, await ameasure(
+        lambda: server.verify_password(hasher, "bench-password", hashed), repeat,
+    ))
+
+
+async def bench_search(server, recorder: Recorder, sizes: List[int], repeat: int, with_scan: bool) -> None:
+    from catalog import ColumnarCatalog
+    from catalog_cache import CatalogCache
+    from search_index import ProductSearchIndex
+
+    for size in sizes:
+        products = generate_catalog(size)
+        # search_products only reads the columnar catalog and the search index
+        cache = CatalogCache(categories=CATEGORIES)
+        start = time.perf_counter()
+        cache.catalog = ColumnarCatalog(products)
+        recorder.add("build ColumnarCatalog", {"size": size}, _summary([time.perf_counter() - start], 1))
+        start = time.perf_counter()
+        cache.search_index = ProductSearchIndex(products)
+        recorder.add("build ProductSearchIndex", {"size": size}, _summary([time.perf_counter() - start], 1))
+
+        cases = [{"q": q} for q in QUERIES] + [{"q": "", "category": "bags", "min_price": 100, "max_price": 500}]
+        for case in cases:
+            kwargs = {"q": "", "category": None, "min_price": None, "max_price": None, "catalog_cache": cache, **case}
+            recorder.add("search_products", {"size": size, **case}, await ameasure(
+                lambda: server.search_products(**kwargs), repeat,
+            ))
+            if with_scan and case["q"]:
+                recorder.add("linear_scan", {"size": size, "q": case["q"]}, measure(
+                    lambda: linear_scan(products, case["q"]), repeat,
+                ))
+
+
+def metadata() -> dict:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: List[dict], previous: List[dict]) -> None:
+    def key(result):
+        return result["name"], json.dumps(result["params"], sort_keys=True, ensure_ascii=False)
+
+    before = {key(r): r for r in previous}
+    print(f"\n{'benchmark':<60}{'before µs':>14}{'after µs':>14}{'ratio':>8}")
+    for result in results:
+        old = before.get(key(result))
+        if old is None:
+            continue
+        label = f"{result['name']} {' '.join(f'{k}={v}' for k, v in result['params'].items())}"
+        print(f"{label:<60}{old['best_us']:>14.2f}{result['best_us']:>14.2f}{result['best_us'] / old['best_us']:>7.2f}x")
+
+
+async def run(args) -> List[dict]:
+    server = load_server()
+    recorder = Recorder()
+    print(f"{'benchmark':<26}{'params':<34}{'best µs':>14}{'median µs':>14}")
+    try:
+        if "auth" in args.groups:
+            await bench_auth(server, recorder, args.repeat)
+        if "search" in args.groups:
+            await bench_search(server, recorder, args.sizes, args.repeat, not args.no_scan)
+    finally:
+        await server.app.state.services.close()
+    return recorder.results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Catalog sizes (SKUs)")
+    parser.add_argument("--groups", nargs="+", choices=["auth", "search"], default=["auth", "search"])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed batches per benchmark")
+    parser.add_argument("--no-scan", action="store_true", help="Skip the linear-scan reference")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    parser.add_argument("--compare", help="Print the ratio against a previous --json file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(
+            {"meta": metadata(), "results": results}, indent=2, ensure_ascii=False,
+        ))
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text())["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Serialization cost per route: FastAPI's default encoding vs FastJSONResponse.
+
+"before" is what FastAPI did for each route: `jsonable_encoder` (or the
+response_model serializer) followed by the stdlib encoder JSONResponse uses.
+"after" is the app's current path through `json_encoding.dumps`.
+
+    python benchmarks/serialization.py [--repeat 200] [--json results.json]
+"""
+import argparse
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from json_encoding import dumps  # noqa: E402
+
+
+class StatusCheck(BaseModel):
+    # Mirrors server.StatusCheck, the response_model of GET /status
+    id: str
+    client_name: str
+    timestamp: datetime
+
+
+def stdlib_dumps(content) -> bytes:
+    # JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def product(i: int) -> dict:
+    return {
+        "id": i,
+        "name": f"حقيبة جلدية فاخرة {i}",
+        "nameEn": f"Luxury Leather Bag {i}",
+        "category": ("bags", "shirts", "jackets", "pants")[i % 4],
+        "price": 199 + (i * 37) % 1500,
+        "image": f"https://images.unsplash.com/photo-{1589363358751 + i}",
+        "isNew": i % 3 == 0,
+    }
+
+
+def order(i: int, now: datetime) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "status": "paid",
+        "payment_status": "paid",
+        "total": 1493.85 + i,
+        "currency": "SAR",
+        "created_at": (now - timedelta(minutes=i)).isoformat(),
+        "items": [{"product_id": j, "name": product(j)["nameEn"], "price": 299.0, "quantity": 1} for j in range(3)],
+    }
+
+
+def address(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": str(uuid.uuid4()),
+        "title": "المنزل",
+        "full_name": "سارة أحمد",
+        "phone": "+966500000000",
+        "street": f"شارع الملك فهد {i}",
+        "city": "الرياض",
+        "region": "الرياض",
+        "postal_code": "12271",
+        "is_default": i == 0,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def cases():
+    now = datetime.now(timezone.utc)
+    products = [product(i) for i in range(1, 1001)]
+    status_adapter = TypeAdapter(List[StatusCheck])
+    status_checks = [
+        StatusCheck(id=str(uuid.uuid4()), client_name=f"client-{i}", timestamp=now - timedelta(seconds=i))
+        for i in range(1000)
+    ]
+    plain = {
+        "GET /products (1000)": {"products": products},
+        "GET /products/search (250)": {"products": products[:250], "total": 250},
+        "GET /orders (100)": {"orders": [order(i, now) for i in range(100)], "next_cursor": "eyJhIjoxfQ"},
+        "GET /addresses (20)": {"addresses": [address(i) for i in range(20)]},
+    }
+    for name, content in plain.items():
+        yield name, (lambda c=content: stdlib_dumps(jsonable_encoder(c))), (lambda c=content: dumps(c))
+
+    # response_model routes keep Pydantic's serializer; only the final encoder changes
+    yield (
+        "GET /status (1000, response_model)",
+        lambda: stdlib_dumps(status_adapter.dump_python(status_checks, mode="json")),
+        lambda: dumps(status_adapter.dump_python(status_checks, mode="json")),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'route':<38}{'before µs':>12}{'after µs':>12}{'speedup':>10}")
+    for name, before, after in cases():
+        assert json.loads(before()) == json.loads(after()), f"{name}: encodings differ"
+        before_us = min(timeit.repeat(before, number=1, repeat=args.repeat)) * 1e6
+        after_us = min(timeit.repeat(after, number=1, repeat=args.repeat)) * 1e6
+        results.append({"route": name, "before_us": round(before_us, 1), "after_us": round(after_us, 1)})
+        print(f"{name:<38}{before_us:>12.1f}{after_us:>12.1f}{before_us / after_us:>9.1f}x")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Worker boot: import time of `server`, startup-to-ready time, and the latency
+of the first requests after startup, each measured in a fresh interpreter.
+
+--cold skips the startup warm-up so the first requests pay for lazy
+initialization themselves, for comparison. --top lists the slowest imports
+from `python -X importtime`.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --runs 5 --cold
+"""
+import argparse
+import asyncio
+import functools
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import BACKEND_DIR
+
+FIRST_REQUESTS = [
+    ("search", "GET", "/api/products/search", {"params": {"q": "bag"}}),
+    ("product_detail", "GET", "/api/products/1", {}),
+    ("register", "POST", "/api/auth/register", {
+        "json": {"email": "boot@7777.com", "password": "boot-password", "name": "Boot"},
+    }),
+    ("login", "POST", "/api/auth/login", {"json": {"email": "boot@7777.com", "password": "boot-password"}}),
+]
+
+
+async def child(cold: bool) -> dict:
+    from benchmarks.harness import install_stand_ins
+
+    install_stand_ins()
+    start = time.perf_counter()
+    import server
+    import_seconds = time.perf_counter() - start
+
+    import httpx
+    from db_indexes import ensure_indexes
+    from warmup import WarmUp
+
+    server.bootstrap_indexes = ensure_indexes
+    app = server.app
+    if cold:
+        app.state.warm_up = WarmUp({"catalog": functools.partial(server.warm_catalog, app)})
+
+    # Startup returns before the warm-up runs; time it to ready
+    start = time.perf_counter()
+    await app.router.startup()
+    await app.state.warm_up.wait()
+    startup_seconds = time.perf_counter() - start
+
+    first = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://boot.local") as client:
+        ready = (await client.get("/health/ready")).json()
+        for name, method, url, kwargs in FIRST_REQUESTS:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            first[name] = time.perf_counter() - start
+            response.raise_for_status()
+    await app.router.shutdown()
+    return {
+        "import_ms": import_seconds * 1000,
+        "startup_ms": startup_seconds * 1000,
+        "ready": ready["ready"],
+        "warm_up_ms": {name: step["seconds"] * 1000 for name, step in ready["steps"].items()},
+        "first_request_ms": {name: seconds * 1000 for name, seconds in first.items()},
+    }
+
+
+def slowest_imports(top: int) -> None:
+    code = "from benchmarks.harness import install_stand_ins; install_stand_ins(); import server"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    print(f"\nSlowest imports (cumulative ms, nested modules indented):")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>10.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="Skip the startup warm-up")
+    parser.add_argument("--top", type=int, default=0, help="Also list the N slowest imports")
+    parser.add_argument("--json", dest="json_path", help="Write the medians to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.cold))))
+        return
+
+    runs = []
+    for _ in range(args.runs):
+        command = [sys.executable, "-m", "benchmarks.startup", "--child"] + (["--cold"] if args.cold else [])
+        result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    def median(get):
+        return round(statistics.median(get(run) for run in runs), 1)
+
+    summary = {
+        "runs": args.runs,
+        "cold": args.cold,
+        "ready_after_startup": all(run["ready"] for run in runs),
+        "import_ms": median(lambda run: run["import_ms"]),
+        "startup_ms": median(lambda run: run["startup_ms"]),
+        "warm_up_ms": {name: median(lambda run: run["warm_up_ms"][name]) for name in runs[0]["warm_up_ms"]},
+        "first_request_ms": {
+            name: median(lambda run: run["first_request_ms"][name]) for name in runs[0]["first_request_ms"]
+        },
+    }
+    print(json.dumps(summary, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.top:
+        slowest_imports(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Synthetic catalogs for the benchmarks: any number of SKUs with Arabic and
+English names drawn from the store's own vocabulary, deterministic per seed.
+"""
+import random
+from typing import List
+
+CATEGORIES = [
+    {"id": "bags", "name": "الحقائب", "nameEn": "Bags"},
+    {"id": "jackets", "name": "الجاكيتات", "nameEn": "Jackets"},
+    {"id": "shirts", "name": "القمصان", "nameEn": "Shirts"},
+    {"id": "pants", "name": "البناطيل", "nameEn": "Pants"},
+]
+
+# (Arabic, English) nouns per category and adjectives shared by all
+NOUNS = {
+    "bags": [("حقيبة", "Bag"), ("حقيبة يد", "Handbag"), ("حقيبة ظهر", "Backpack"), ("محفظة", "Wallet"), ("حقيبة كتف", "Shoulder Bag")],
+    "jackets": [("جاكيت", "Jacket"), ("معطف", "Coat"), ("سترة", "Blazer"), ("جاكيت جلدي", "Leather Jacket")],
+    "shirts": [("قميص", "Shirt"), ("قميص بولو", "Polo Shirt"), ("تيشيرت", "T-Shirt"), ("بلوزة", "Blouse")],
+    "pants": [("بنطلون", "Pants"), ("جينز", "Jeans"), ("شورت", "Shorts"), ("بنطلون قماش", "Chinos")],
+}
+ADJECTIVES = [
+    ("فاخر", "Luxury"), ("كلاسيكي", "Classic"), ("عصري", "Modern"), ("أنيق", "Elegant"),
+    ("صيفي", "Summer"), ("شتوي", "Winter"), ("قطني", "Cotton"), ("جلدي", "Leather"),
+    ("عملي", "Practical"), ("رسمي", "Formal"), ("كاجوال", "Casual"), ("خفيف", "Light"),
+]
+COLORS = [
+    ("أسود", "Black"), ("أبيض", "White"), ("بني", "Brown"), ("كحلي", "Navy"),
+    ("رمادي", "Grey"), ("بيج", "Beige"), ("أحمر", "Red"), ("أخضر", "Green"),
+]
+
+# Brand names are made up from syllables, giving a vocabulary of a few hundred
+# words like a real store's rather than one unique token per SKU
+SYLLABLES = ["ka", "ri", "mo", "la", "zen", "sa", "to", "vi", "na", "ra", "lu", "de"]
+BRAND_COUNT = 300
+
+# Words to search for, covering hits in both languages, prefixes and a typo
+QUERIES = ["bag", "حقيبة", "leather jacket", "قميص قطني", "summ", "lether", "navy polo shirt"]
+
+
+def generate_catalog(size: int, seed: int = 7777) -> List[dict]:
+    rng = random.Random(seed)
+    brands = sorted({
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        for _ in range(BRAND_COUNT)
+    })
+    products = []
+    for product_id in range(1, size + 1):
+        category = CATEGORIES[rng.randrange(len(CATEGORIES))]["id"]
+        noun_ar, noun_en = rng.choice(NOUNS[category])
+        adj_ar, adj_en = rng.choice(ADJECTIVES)
+        color_ar, color_en = rng.choice(COLORS)
+        brand = rng.choice(brands)
+        products.append({
+            "id": product_id,
+            "name": f"{noun_ar} {adj_ar} {color_ar} من {brand}",
+            "nameEn": f"{brand} {color_en} {adj_en} {noun_en}",
+            "category": category,
+            "price": rng.randrange(49, 2500),
+            "image": f"https://images.example.com/products/{product_id}.jpg",
+            "isNew": rng.random() < 0.2,
+        })
+    return products
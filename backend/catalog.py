@@ -0,0 +1,223 @@
+"""
+Columnar product catalog.
+
+Products are stored column-wise: NumPy arrays for id, price, isNew and
+category codes, and interned Python strings for the text fields. Category and
+price filters run as vectorized masks, and price ranges are answered with a
+binary search over a price-sorted permutation instead of a per-product loop.
+An id -> row hash index and per-category partitions are kept alongside, so
+product detail and category listings don't touch the rest of the catalog.
+Changes go through `apply` in batches: columns grow into spare capacity
+instead of being copied per row, and the price order and partitions are
+rebuilt once per batch.
+"""
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+ID_DTYPE = np.int64
+PRICE_DTYPE = np.float64
+CATEGORY_DTYPE = np.int32
+
+# Smallest backing array allocated once rows are appended
+MIN_CAPACITY = 64
+
+
+def _json_price(price: float):
+    # Keep whole prices as ints so payloads stay `1299`, not `1299.0`
+    return int(price) if price.is_integer() else price
+
+
+class ColumnarCatalog:
+    def __init__(self, products: Iterable[dict] = ()):
+        products = list(products)
+        self._categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+
+        # Backing arrays with spare capacity; the public columns are views of their first _size rows
+        self._size = len(products)
+        self._columns: Dict[str, np.ndarray] = {
+            "ids": np.array([p["id"] for p in products], dtype=ID_DTYPE),
+            "prices": np.array([p["price"] for p in products], dtype=PRICE_DTYPE),
+            "is_new": np.array([bool(p.get("isNew", False)) for p in products], dtype=bool),
+            "category_codes": np.array(
+                [self._category_code(p["category"]) for p in products], dtype=CATEGORY_DTYPE
+            ),
+            "alive": np.ones(len(products), dtype=bool),
+        }
+        self._expose_columns()
+        self.names: List[str] = [sys.intern(p["name"]) for p in products]
+        self.names_en: List[str] = [sys.intern(p["nameEn"]) for p in products]
+        self.images: List[str] = [sys.intern(p["image"]) for p in products]
+        self._row_by_id: Dict[int, int] = {int(pid): row for row, pid in enumerate(self.ids)}
+        self._partitions: Dict[int, np.ndarray] = {}
+        # Materialized record lists per category (None = whole catalog), built on first use
+        self._partition_records: Dict[Optional[str], List[dict]] = {}
+        self._reindex()
+        for code in range(len(self._categories)):
+            self._repartition(code)
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self._categories)
+            self._categories.append(sys.intern(category))
+            self._category_codes[self._categories[code]] = code
+        return code
+
+    def _expose_columns(self) -> None:
+        for name, column in self._columns.items():
+            setattr(self, name, column[:self._size])
+
+    def _reserve(self, rows: int) -> None:
+        capacity = len(self._columns["ids"])
+        if self._size + rows <= capacity:
+            return
+        capacity = max(2 * capacity, self._size + rows, MIN_CAPACITY)
+        for name, column in self._columns.items():
+            # Zero-filled, so spare rows are never alive
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def _reindex(self) -> None:
+        # Price-sorted permutation of live rows
+        live = np.flatnonzero(self.alive)
+        self._price_order = live[np.argsort(self.prices[live], kind="stable")]
+        self._sorted_prices = self.prices[self._price_order]
+
+    def _repartition(self, code: int) -> None:
+        self._partitions[code] = np.flatnonzero(self.alive & (self.category_codes == code))
+        self._partition_records.pop(self._categories[code], None)
+        self._partition_records.pop(None, None)
+
+    # ---------- maintenance ----------
+
+    def apply(self, upserts: Iterable[dict] = (), removed: Iterable[int] = ()) -> None:
+        """Insert or update `upserts` and drop `removed`, then reindex once for the whole batch."""
+        upserts = list(upserts)
+        self._reserve(len(upserts))
+        columns = self._columns
+        touched = set()
+        for product_id in removed:
+            row = self._row_by_id.pop(product_id, None)
+            if row is not None:
+                columns["alive"][row] = False
+                touched.add(int(columns["category_codes"][row]))
+        for product in upserts:
+            row = self._row_by_id.get(product["id"])
+            code = self._category_code(product["category"])
+            touched.add(code)
+            if row is not None:
+                touched.add(int(columns["category_codes"][row]))
+                self.names[row] = sys.intern(product["name"])
+                self.names_en[row] = sys.intern(product["nameEn"])
+                self.images[row] = sys.intern(product["image"])
+            else:
+                row = self._row_by_id[product["id"]] = self._size
+                self._size += 1
+                columns["ids"][row] = product["id"]
+                columns["alive"][row] = True
+                self.names.append(sys.intern(product["name"]))
+                self.names_en.append(sys.intern(product["nameEn"]))
+                self.images.append(sys.intern(product["image"]))
+            columns["prices"][row] = product["price"]
+            columns["is_new"][row] = bool(product.get("isNew", False))
+            columns["category_codes"][row] = code
+        if not touched:
+            return
+        self._expose_columns()
+        self._reindex()
+        for code in touched:
+            self._repartition(code)
+
+    def upsert(self, product: dict) -> None:
+        self.apply([product])
+
+    def remove(self, product_id: int) -> None:
+        self.apply(removed=[product_id])
+
+    # ---------- queries ----------
+
+    def rows_for_ids(self, product_ids: Iterable[int]) -> np.ndarray:
+        """Rows of the given ids, in the given order; unknown ids are dropped."""
+        row_by_id = self._row_by_id
+        return np.array([row_by_id[pid] for pid in product_ids if pid in row_by_id], dtype=np.intp)
+
+    def has_category(self, category: str) -> bool:
+        code = self._category_codes.get(category)
+        return code is not None and len(self._partitions[code]) > 0
+
+    def product_ids(self) -> List[int]:
+        return list(self._row_by_id)
+
+    def get(self, product_id: int) -> Optional[dict]:
+        row = self._row_by_id.get(product_id)
+        return None if row is None else self.record(row)
+
+    def partition(self, category: Optional[str] = None) -> List[dict]:
+        """All products of a category (or the whole catalog), materialized once per change."""
+        records = self._partition_records.get(category)
+        if records is None:
+            if category is None:
+                records = self.records()
+            else:
+                code = self._category_codes.get(category)
+                if code is None:
+                    return []
+                records = self.records(self._partitions[code])
+            self._partition_records[category] = records
+        return records
+
+    def filter_mask(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> np.ndarray:
+        mask = np.zeros_like(self.alive) if category else self.alive.copy()
+        if category:
+            code = self._category_codes.get(category)
+            if code is None:
+                return mask
+            mask[self._partitions[code]] = True
+        if min_price or max_price:
+            lo = np.searchsorted(self._sorted_prices, min_price, side="left") if min_price else 0
+            hi = np.searchsorted(self._sorted_prices, max_price, side="right") if max_price else len(self._sorted_prices)
+            in_range = np.zeros_like(mask)
+            in_range[self._price_order[lo:hi]] = True
+            mask &= in_range
+        return mask
+
+    def filter(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Matching rows, in catalog order or in the order of `rows` when given."""
+        mask = self.filter_mask(category, min_price, max_price)
+        if rows is None:
+            return np.flatnonzero(mask)
+        return rows[mask[rows]]
+
+    def record(self, row: int) -> dict:
+        return {
+            "id": int(self.ids[row]),
+            "name": self.names[row],
+            "nameEn": self.names_en[row],
+            "category": self._categories[self.category_codes[row]],
+            "price": _json_price(float(self.prices[row])),
+            "image": self.images[row],
+            "isNew": bool(self.is_new[row]),
+        }
+
+    def records(self, rows: Optional[Iterable[int]] = None) -> List[dict]:
+        if rows is None:
+            rows = np.flatnonzero(self.alive)
+        return [self.record(int(row)) for row in rows]
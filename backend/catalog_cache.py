@@ -0,0 +1,203 @@
+"""
+MongoDB-backed product catalog with an in-process, versioned read-through cache.
+
+Products and categories live in the `products` and `categories` collections.
+Every worker keeps the whole catalog in memory (columnar store, search index,
+autocomplete index) and only re-reads MongoDB when the version stamp in
+`catalog_meta` changes. A background task polls that stamp, so requests never
+wait on MongoDB for catalog data. Large changes are rebuilt in a worker thread
+and swapped in whole, so they don't wait on a rebuild either.
+
+Anything that edits products or categories must call `bump_catalog_version`
+afterwards so workers pick the change up.
+"""
+import asyncio
+import itertools
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+from autocomplete import SuggestionIndex
+from catalog import ColumnarCatalog
+from compression import MINIMUM_SIZE
+from http_cache import CachedPayload
+from search_index import DeletionDictionary, ProductSearchIndex
+
+logger = logging.getLogger(__name__)
+
+CATALOG_META_ID = "products"
+
+PRODUCT_PROJECTION = {"_id": 0, "id": 1, "name": 1, "nameEn": 1, "category": 1, "price": 1, "image": 1, "isNew": 1}
+CATEGORY_PROJECTION = {"_id": 0, "id": 1, "name": 1, "nameEn": 1}
+
+# Up to this many changed products are patched into the live structures on the
+# event loop; larger changes are rebuilt in a worker thread and swapped in
+PATCH_MAX_CHANGES = 32
+
+# Replaced structures are freed this many items at a time (see _release)
+RELEASE_CHUNK = 10_000
+
+
+def _drain(container: Any) -> None:
+    # Nested containers go first, so no single dealloc frees more than a chunk
+    if isinstance(container, DeletionDictionary):
+        # The typo index's delete map is the largest single structure
+        _drain(vars(container))
+    elif isinstance(container, dict):
+        while container:
+            for key in list(itertools.islice(container, RELEASE_CHUNK)):
+                _drain(container.pop(key))
+    elif isinstance(container, list):
+        while container:
+            for item in container[-RELEASE_CHUNK:]:
+                _drain(item)
+            del container[-RELEASE_CHUNK:]
+
+
+def _release(structures: List[Any]) -> None:
+    """Free replaced catalog structures a chunk at a time.
+
+    Dropping a 100k-product index at once is one C-level dealloc of several
+    hundred milliseconds that holds the GIL throughout; emptying it piece by
+    piece from a worker thread lets the event loop run in between.
+    """
+    while structures:
+        _drain(vars(structures.pop()))
+
+
+async def bump_catalog_version(db) -> int:
+    meta = await db.catalog_meta.find_one_and_update(
+        {"_id": CATALOG_META_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return meta["version"]
+
+
+async def seed_catalog(db, products: Iterable[dict], categories: Iterable[dict]) -> None:
+    """Insert the bundled catalog if the collections are empty (safe to run from every worker)."""
+    if await db.products.estimated_document_count() == 0:
+        await db.products.bulk_write(
+            [UpdateOne({"id": p["id"]}, {"$setOnInsert": p}, upsert=True) for p in products],
+            ordered=False,
+        )
+        await db.catalog_meta.update_one(
+            {"_id": CATALOG_META_ID}, {"$setOnInsert": {"version": 1}}, upsert=True
+        )
+    if await db.categories.estimated_document_count() == 0:
+        await db.categories.bulk_write(
+            [UpdateOne({"id": c["id"]}, {"$setOnInsert": c}, upsert=True) for c in categories],
+            ordered=True,
+        )
+
+
+class CatalogCache:
+    def __init__(
+        self,
+        products: Iterable[dict] = (),
+        categories: Iterable[dict] = (),
+        compression_minimum_size: int = MINIMUM_SIZE,
+    ):
+        self.version: Optional[int] = None
+        self.catalog, self.search_index, self.suggestions = self._build(list(products))
+        self.categories: List[dict] = list(categories)
+        # Serialized responses for this catalog version, dropped whenever it changes
+        self._payloads: Dict[Hashable, CachedPayload] = {}
+        # The compression middleware's threshold, so payloads it would compress come precompressed
+        self.compression_minimum_size = compression_minimum_size
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Serializes loads from the warm-up retries and the refresh loop
+        self._lock = asyncio.Lock()
+
+    def _diff(self, incoming: Dict[int, dict]) -> Tuple[List[int], List[dict]]:
+        removed = [pid for pid in self.catalog.product_ids() if pid not in incoming]
+        changed = [p for pid, p in incoming.items() if self.catalog.get(pid) != p]
+        return removed, changed
+
+    @staticmethod
+    def _build(products: List[dict]) -> Tuple[ColumnarCatalog, ProductSearchIndex, SuggestionIndex]:
+        return ColumnarCatalog(products), ProductSearchIndex(products), SuggestionIndex(products)
+
+    async def apply(self, products: Iterable[dict], categories: List[dict], version: Optional[int]) -> int:
+        """Swap in a new catalog snapshot, touching only products that changed.
+
+        Diffing and rebuilding run in a worker thread, which only reads the
+        live structures; they are replaced with a single assignment, so
+        requests see either the old catalog or the new one.
+        """
+        async with self._lock:
+            incoming: Dict[int, dict] = {p["id"]: p for p in products}
+            removed, changed = await asyncio.to_thread(self._diff, incoming)
+
+            if len(removed) + len(changed) > PATCH_MAX_CHANGES:
+                structures = await asyncio.to_thread(self._build, list(incoming.values()))
+                replaced = [self.catalog, self.search_index, self.suggestions]
+                self.catalog, self.search_index, self.suggestions = structures
+                del structures
+                await asyncio.to_thread(_release, replaced)
+            else:
+                self.catalog.apply(changed, removed)
+                for product_id in removed:
+                    self.search_index.remove(product_id)
+                    self.suggestions.remove(product_id)
+                for product in changed:
+                    self.search_index.upsert(product)
+                    self.suggestions.upsert(product)
+            if removed or changed or categories != self.categories:
+                self._payloads.clear()
+            self.categories = categories
+            self.version = version
+            return len(removed) + len(changed)
+
+    def payload(self, key: Hashable, build: Callable[[], Any]) -> CachedPayload:
+        """The serialized response for `key`, built by `build()` once per catalog version.
+
+        Keys must come from a bounded set (known categories, existing product ids).
+        """
+        payload = self._payloads.get(key)
+        if payload is None:
+            payload = self._payloads[key] = CachedPayload(build(), self.compression_minimum_size)
+        return payload
+
+    async def _fetch_version(self, db) -> Optional[int]:
+        meta = await db.catalog_meta.find_one({"_id": CATALOG_META_ID}, {"version": 1})
+        return meta.get("version") if meta else None
+
+    async def load(self, db) -> None:
+        version = await self._fetch_version(db)
+        products = await db.products.find({}, PRODUCT_PROJECTION).sort("id", 1).to_list(None)
+        # Insertion order, so the seeded category order is kept
+        categories = await db.categories.find({}, CATEGORY_PROJECTION).sort("_id", 1).to_list(None)
+        changed = await self.apply(products, categories, version)
+        logger.info(f"Catalog version {version} loaded: {len(products)} products, {changed} changed")
+
+    async def refresh(self, db) -> bool:
+        """Reload the catalog if its version stamp moved; returns whether it did."""
+        if await self._fetch_version(db) == self.version:
+            return False
+        await self.load(db)
+        return True
+
+    async def _refresh_loop(self, db, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                logger.error(f"Catalog refresh failed: {str(e)}")
+
+    def start_refresh(self, db, interval: float) -> None:
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(db, interval))
+
+    async def stop_refresh(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
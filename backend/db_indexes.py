@@ -0,0 +1,131 @@
+"""
+MongoDB index declarations, created at startup and checked against the
+query shapes the routes actually run.
+
+Add an index here together with any new query; `verify_query_shapes` explains
+each shape in QUERY_SHAPES and logs the ones that still fall back to a
+collection scan.
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Applied webhook events are kept this long, to drop Stripe's retries of them
+# (Stripe retries an undelivered event for up to three days)
+WEBHOOK_EVENT_RETENTION_SECONDS = 30 * 24 * 3600
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "addresses": [
+        IndexModel([("user_id", ASCENDING), ("id", ASCENDING)], name="user_id_id"),
+    ],
+    "orders": [
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="user_id_created_at_id",
+        ),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("session_id", ASCENDING)], name="session_id"),
+    ],
+    "payment_transactions": [
+        IndexModel([("session_id", ASCENDING)], name="session_id"),
+    ],
+    "wishlists": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "webhook_events": [
+        # Unprocessed events (processed_at null) never expire
+        IndexModel(
+            [("processed_at", ASCENDING)], name="processed_at_ttl", expireAfterSeconds=WEBHOOK_EVENT_RETENTION_SECONDS,
+        ),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "products": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "categories": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+}
+
+# Indexes replaced by one declared above on the same keys; dropped before the
+# replacement is created, since MongoDB won't hold both
+SUPERSEDED_INDEXES: Dict[str, List[str]] = {
+    "webhook_events": ["processed_at"],
+}
+
+# (collection, filter, sort) for every lookup the routes make
+QUERY_SHAPES: List[Tuple[str, dict, Optional[list]]] = [
+    ("users", {"email": ""}, None),
+    ("users", {"id": ""}, None),
+    ("addresses", {"user_id": ""}, None),
+    ("addresses", {"id": "", "user_id": ""}, None),
+    ("orders", {"user_id": ""}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("orders", {"id": "", "user_id": ""}, None),
+    ("orders", {"session_id": ""}, None),
+    ("payment_transactions", {"session_id": ""}, None),
+    ("wishlists", {"user_id": ""}, None),
+    ("webhook_events", {"processed_at": None}, None),
+    ("products", {"id": 0}, None),
+]
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create declared indexes that don't exist yet; returns the names created per collection."""
+    created: Dict[str, List[str]] = {}
+    for collection, models in INDEXES.items():
+        try:
+            existing = await db[collection].index_information()
+            for name in SUPERSEDED_INDEXES.get(collection, []):
+                if name in existing:
+                    await db[collection].drop_index(name)
+                    logger.info(f"Dropped superseded index {name} on {collection}")
+            missing = [model for model in models if model.document["name"] not in existing]
+            if missing:
+                created[collection] = await db[collection].create_indexes(missing)
+                logger.info(f"Created indexes on {collection}: {created[collection]}")
+        except PyMongoError as e:
+            logger.error(f"Could not create indexes on {collection}: {str(e)}")
+    return created
+
+
+def _has_collscan(plan: dict) -> bool:
+    if plan.get("stage") == "COLLSCAN":
+        return True
+    children = plan.get("inputStages") or ([plan["inputStage"]] if "inputStage" in plan else [])
+    return any(_has_collscan(child) for child in children)
+
+
+async def verify_query_shapes(db) -> List[str]:
+    """Explain every declared query shape and report those that scan the collection."""
+    unindexed = []
+    for collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            explain = await cursor.explain()
+        except PyMongoError as e:
+            logger.error(f"Could not explain {collection} {list(query)}: {str(e)}")
+            continue
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        # Newer servers nest the classic plan under queryPlan
+        if _has_collscan(winning_plan.get("queryPlan", winning_plan)):
+            shape = f"{collection} filter={list(query)} sort={sort}"
+            unindexed.append(shape)
+            logger.warning(f"Query runs without an index: {shape}")
+    return unindexed
+
+
+async def bootstrap_indexes(db) -> List[str]:
+    await ensure_indexes(db)
+    return await verify_query_shapes(db)
@@ -0,0 +1,54 @@
+"""
+Pre-serialized JSON payloads with strong ETags for cacheable responses.
+
+A payload is serialized, hashed and compressed once; requests whose
+If-None-Match matches get an empty 304, everything else gets the stored bytes
+as-is, in the best encoding the client accepts.
+"""
+import hashlib
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+from compression import MINIMUM_SIZE, negotiate, precompress
+from json_encoding import dumps
+
+
+class CachedPayload:
+    __slots__ = ("body", "etag", "variants")
+
+    def __init__(self, content: Any, minimum_size: int = MINIMUM_SIZE):
+        # Same encoding as the app's FastJSONResponse
+        self.body = dumps(content)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        # Compressed bodies by content-coding, served without touching the middleware
+        self.variants: Dict[str, bytes] = precompress(self.body, minimum_size)
+
+    def representation(self, encoding: Optional[str]) -> tuple:
+        """(body, etag) for a content-coding; each encoding gets its own strong ETag."""
+        if encoding is None:
+            return self.body, self.etag
+        return self.variants[encoding], f'{self.etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cached_json_response(request: Request, payload: CachedPayload, cache_control: str) -> Response:
+    encoding = negotiate(request.headers.get("accept-encoding"), payload.variants)
+    body, etag = payload.representation(encoding)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if payload.variants:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
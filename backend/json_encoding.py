@@ -0,0 +1,62 @@
+"""
+orjson-based JSON encoding for API responses.
+
+FastAPI normally walks every return value with `jsonable_encoder` and then
+runs the result through the stdlib `json` module. FastJSONResponse renders
+with orjson instead, which handles datetime, date, UUID, dataclasses and
+NumPy scalars natively. FastJSONRoute skips the `jsonable_encoder` pass for
+routes without a response_model, which is where most of the time went on
+large dict payloads like /orders.
+"""
+import asyncio
+import functools
+from typing import Any, Callable
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+# Non-str keys are stringified and NumPy values serialized, as jsonable_encoder did
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    # Anything orjson doesn't know natively (Pydantic models, Decimal, sets, ...)
+    return jsonable_encoder(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON; datetimes render like `isoformat()`, UUIDs as strings."""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _render_result(endpoint: Callable, status_code: int) -> Callable:
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        if isinstance(result, Response):
+            return result
+        return FastJSONResponse(result, status_code=status_code)
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """
+    APIRoute that hands results of routes without a response_model straight
+    to FastJSONResponse. Routes with a response_model keep FastAPI's
+    validation and serialization.
+    """
+
+    def get_route_handler(self):
+        if self.response_field is None and asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = _render_result(self.dependant.call, self.status_code or 200)
+        return super().get_route_handler()
@@ -0,0 +1,42 @@
+"""
+Streaming NDJSON responses for list endpoints.
+
+Clients opt in with `Accept: application/x-ndjson` or `?format=ndjson`; the
+Motor cursor is then drained in batches and written out one JSON document
+per line as it arrives, so memory stays flat however many documents match.
+"""
+from typing import Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from json_encoding import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Documents fetched per cursor round trip and written per chunk
+NDJSON_BATCH_SIZE = 200
+
+
+def wants_ndjson(request: Request, response_format: Optional[str] = None) -> bool:
+    if response_format:
+        return response_format.lower() == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(cursor, transform: Optional[Callable[[dict], dict]] = None) -> StreamingResponse:
+    cursor = cursor.batch_size(NDJSON_BATCH_SIZE)
+
+    async def lines():
+        chunk = []
+        async for doc in cursor:
+            if transform is not None:
+                doc = transform(doc)
+            chunk.append(dumps(doc))
+            if len(chunk) >= NDJSON_BATCH_SIZE:
+                yield b"\n".join(chunk) + b"\n"
+                chunk = []
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
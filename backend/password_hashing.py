@@ -0,0 +1,48 @@
+"""
+Bounded worker pool for bcrypt hashing and verification.
+
+bcrypt takes tens to hundreds of milliseconds per call; run inline it blocks
+the event loop and every other request on the worker. The pyca `bcrypt`
+backend releases the GIL while hashing, so a small thread pool gives real
+parallelism without pickling the CryptContext into a process pool. Callers
+beyond `max_pending` are rejected instead of queueing without bound.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+
+class PasswordHasherSaturated(Exception):
+    """Raised when too many hash/verify calls are already waiting."""
+
+
+class PasswordHasher:
+    def __init__(self, context: CryptContext, max_workers: int, max_pending: int):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise PasswordHasherSaturated()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def warm_up(self) -> None:
+        """Load the bcrypt backend (passlib self-tests it on first use) and start a worker thread."""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.context.dummy_verify)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
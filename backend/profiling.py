@@ -0,0 +1,131 @@
+"""
+On-demand profiling for live workers.
+
+`StackSampler` walks every thread's stack from a background thread at a fixed
+interval (`sys._current_frames`, no tracing hooks), so the worker keeps
+serving at full speed while it runs. It returns collapsed stacks ("a;b;c 12"
+per line) that flamegraph.pl, speedscope or inferno read directly.
+
+`ProfilingMiddleware` profiles single requests with cProfile when they carry
+the profiler token, returning pstats output instead of the response body.
+"""
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+
+# Carries the profiler token on a request to be profiled on its own
+REQUEST_PROFILE_HEADER = "x-profile-request"
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already running on this worker."""
+
+
+def token_matches(provided: Optional[str], expected: Optional[str]) -> bool:
+    # No configured token means profiling is disabled
+    if not expected or not provided:
+        return False
+    return hmac.compare_digest(provided.encode(), expected.encode())
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def sample(self, seconds: float, interval: float) -> Dict[str, int]:
+        """Sample all other threads for `seconds`; blocking, so run it off the event loop."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            me = threading.get_ident()
+            counts: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, str(ident)))
+                    counts[";".join(reversed(stack))] += 1
+                time.sleep(interval)
+            return dict(counts)
+        finally:
+            self._lock.release()
+
+
+def collapsed(counts: Dict[str, int]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+class ProfilingMiddleware:
+    """Profiles a request with cProfile when it carries a valid profiler token.
+
+    cProfile records everything on the event loop thread while the request is in
+    flight, including other requests interleaved with it; work sent to thread
+    pools (bcrypt, Stripe) shows up as time waiting on the loop.
+    """
+
+    def __init__(self, app, token: Optional[str], limit: int = 60):
+        self.app = app
+        self.token = token
+        self.limit = limit
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.token:
+            await self.app(scope, receive, send)
+            return
+        if not token_matches(Headers(scope=scope).get(REQUEST_PROFILE_HEADER), self.token) or self._active:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        self._active = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.disable()
+            self._active = False
+        elapsed = time.perf_counter() - start
+
+        out = io.StringIO()
+        out.write(f"{scope['method']} {scope['path']} -> {status} in {elapsed * 1000:.1f} ms\n\n")
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(self.limit)
+        body = out.getvalue().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profiled-status", str(status).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,121 @@
+"""
+Token-bucket rate limiting for the auth routes.
+
+Each bucket holds up to `capacity` tokens and refills continuously; a request
+takes one token or is rejected with the time until the next one. Buckets live
+in a bounded in-process LRU by default. MongoBucketStore shares them between
+workers, with the in-process store as a fallback when MongoDB is unavailable.
+"""
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class BucketRule:
+    __slots__ = ("capacity", "refill_per_second")
+
+    def __init__(self, capacity: int, per_seconds: float):
+        """`capacity` requests in a burst, refilling at `capacity` per `per_seconds`."""
+        self.capacity = capacity
+        self.refill_per_second = capacity / per_seconds
+
+    def retry_after(self, tokens: float) -> float:
+        return max(0.0, (1 - tokens) / self.refill_per_second)
+
+
+class MemoryBucketStore:
+    """Buckets for one worker. The least recently used are dropped past `maxsize`,
+    which only hands that key a full bucket again. Threading as for caching.TTLCache.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str, rule: BucketRule) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (rule.capacity, now))
+        tokens = min(rule.capacity, tokens + (now - updated_at) * rule.refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return 0.0 if allowed else rule.retry_after(tokens)
+
+
+class MongoBucketStore:
+    """Buckets shared by every worker, one document per key updated atomically."""
+
+    def __init__(self, db, fallback: MemoryBucketStore, collection: str = "rate_limits"):
+        self.collection = db[collection]
+        self.fallback = fallback
+
+    async def take(self, key: str, rule: BucketRule) -> float:
+        now = time.time()
+        refilled = {"$min": [
+            rule.capacity,
+            {"$add": [
+                {"$ifNull": ["$tokens", rule.capacity]},
+                {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, rule.refill_per_second]},
+            ]},
+        ]}
+        # A full bucket carries no state, so the document can expire once it would be full again
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=rule.capacity / rule.refill_per_second)
+        try:
+            doc = await self.collection.find_one_and_update(
+                {"_id": key},
+                [
+                    {"$set": {"tokens": refilled, "updated_at": now, "expires_at": expires_at}},
+                    {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                    {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+                ],
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except PyMongoError as e:
+            logger.error(f"Shared rate limit store unavailable, using local buckets: {str(e)}")
+            return await self.fallback.take(key, rule)
+        return 0.0 if doc["allowed"] else rule.retry_after(doc["tokens"])
+
+
+def client_ip(request, trusted_proxy_hops: int) -> str:
+    """The caller's address, read from X-Forwarded-For when behind that many proxies.
+
+    Only the entries our own proxies appended are trusted; anything further left
+    was sent by the client and can be forged.
+    """
+    if trusted_proxy_hops > 0:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if forwarded:
+            return forwarded[-min(trusted_proxy_hops, len(forwarded))]
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    def __init__(self, store):
+        self.store = store
+
+    async def check(self, *limits: Tuple[str, BucketRule, str]) -> Optional[float]:
+        """Take a token from each (name, rule, key) bucket in order.
+
+        Stops at the first empty bucket, so a client already over one limit does
+        not drain the others; returns its retry-after in seconds, or None.
+        """
+        for name, rule, key in limits:
+            retry_after = await self.store.take(f"{name}:{key}", rule)
+            if retry_after > 0:
+                return retry_after
+        return None
@@ -0,0 +1,322 @@
+"""
+In-memory inverted index over product names (Arabic `name` and English `nameEn`).
+
+The index is built once when the catalog loads and kept up to date with
+`upsert`/`remove`, so a search only touches the postings of the query tokens
+instead of scanning every product. Text is normalized (Arabic letter variants,
+diacritics, tatweel, Latin accents) before indexing, and a SymSpell-style
+deletion dictionary gives typo-tolerant lookup without edit-distance scans.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from math import log
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Harakat, superscript alef and Quranic marks carry no meaning for search
+ARABIC_DIACRITICS_RE = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
+TATWEEL = "\u0640"
+
+# Alef with hamza or madda would lose its mark to NFKD; park it on "ٲ" until
+# the article is checked so "ألوان" is not read as "ال" + "وان"
+HAMZA_ALEF_MAP = str.maketrans({"أ": "ٲ", "إ": "ٲ", "آ": "ٲ"})
+
+ARABIC_LETTER_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ٲ": "ا",
+    "ة": "ه",
+    "ى": "ي",
+    "ؤ": "و",
+    "ئ": "ي",
+    # Arabic-Indic and Persian digits
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+    **{chr(0x06F0 + d): str(d) for d in range(10)},
+})
+
+# Only a bare (or wasla) alef starts the article; "ألوان" and "آلة" are stems.
+# Checked before alef variants are folded together.
+ARABIC_DEFINITE_ARTICLES = ("ال", "ٱل")
+# Shorter remainders are stems too; as the last word of a query they are
+# treated as input still being typed ("الح")
+ARTICLE_MIN_STEM_LENGTH = 3
+
+# Fields that are indexed, with the weight a hit in that field contributes
+INDEXED_FIELDS = (("name", 1.0), ("nameEn", 1.0))
+
+# A whole-token hit ranks above a prefix hit ("bag" vs "bags")
+EXACT_MATCH_BOOST = 2.0
+PREFIX_MATCH_BOOST = 1.0
+
+# Typo tolerance: tokens shorter than this must match exactly or by prefix
+FUZZY_MIN_TOKEN_LENGTH = 4
+FUZZY_MAX_EDIT_DISTANCE = 2
+# Tokens at least this long may be two edits away, shorter ones only one
+FUZZY_LONG_TOKEN_LENGTH = 7
+# Only the leading characters feed the deletion dictionary (as in SymSpell)
+FUZZY_PREFIX_LENGTH = 7
+FUZZY_MATCH_BOOST = 0.5
+
+
+def fold_text(text: str) -> str:
+    """Fold case, accents, diacritics and tatweel; Arabic letter variants are kept."""
+    text = unicodedata.normalize("NFC", text.lower()).translate(HAMZA_ALEF_MAP)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = ARABIC_DIACRITICS_RE.sub("", text).replace(TATWEEL, "")
+    return unicodedata.normalize("NFC", text)
+
+
+def normalize_text(text: str) -> str:
+    """Fold case, accents and Arabic orthographic variants to one form."""
+    return fold_text(text).translate(ARABIC_LETTER_MAP)
+
+
+def _article_stem(token: str) -> Optional[str]:
+    for article in ARABIC_DEFINITE_ARTICLES:
+        stem = token[len(article):]
+        if token.startswith(article) and stem[:1].isalpha():
+            return stem
+    return None
+
+
+def normalize_token(token: str) -> str:
+    # Takes a folded token. "الحقيبة" and "حقيبة" should land on the same posting list
+    stem = _article_stem(token)
+    if stem is not None and len(stem) >= ARTICLE_MIN_STEM_LENGTH:
+        token = stem
+    return token.translate(ARABIC_LETTER_MAP)
+
+
+def unfinished_article_stem(text: str) -> Optional[str]:
+    """The stem typed so far when the last word is the article plus a letter or two ("الح" -> "ح")."""
+    tokens = TOKEN_RE.findall(fold_text(text))
+    stem = _article_stem(tokens[-1]) if tokens else None
+    if stem is None or len(stem) >= ARTICLE_MIN_STEM_LENGTH:
+        return None
+    return stem.translate(ARABIC_LETTER_MAP)
+
+
+def tokenize(text: str) -> List[str]:
+    return [normalize_token(token) for token in TOKEN_RE.findall(fold_text(text))]
+
+
+def index_terms(text: str) -> List[Tuple[str, str]]:
+    """(token, raw token) pairs; the raw form is indexed as well so "الح" still completes."""
+    return [
+        (normalize_token(token), token.translate(ARABIC_LETTER_MAP))
+        for token in TOKEN_RE.findall(fold_text(text))
+    ]
+
+
+def max_edit_distance(token: str) -> int:
+    if len(token) < FUZZY_MIN_TOKEN_LENGTH:
+        return 0
+    return 1 if len(token) < FUZZY_LONG_TOKEN_LENGTH else FUZZY_MAX_EDIT_DISTANCE
+
+
+def damerau_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance, or max_distance + 1 once exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class DeletionDictionary:
+    """SymSpell-style index: every term is stored under all its deletes.
+
+    Looking up a misspelling only generates the query's own deletes and
+    verifies the handful of terms sharing one, so the cost is independent
+    of vocabulary size.
+    """
+
+    def __init__(self, max_distance: int = FUZZY_MAX_EDIT_DISTANCE,
+                 prefix_length: int = FUZZY_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._deletes: Dict[str, Set[str]] = defaultdict(set)
+
+    def _variants(self, term: str, max_distance: int) -> Set[str]:
+        key = term[:self.prefix_length]
+        variants = {key}
+        frontier = {key}
+        for _ in range(max_distance):
+            next_frontier = set()
+            for word in frontier:
+                for i in range(len(word)):
+                    deleted = word[:i] + word[i + 1:]
+                    if deleted not in variants:
+                        next_frontier.add(deleted)
+            variants |= next_frontier
+            frontier = next_frontier
+        return variants
+
+    def add(self, term: str) -> None:
+        for variant in self._variants(term, self.max_distance):
+            self._deletes[variant].add(term)
+
+    def discard(self, term: str) -> None:
+        for variant in self._variants(term, self.max_distance):
+            terms = self._deletes.get(variant)
+            if terms is None:
+                continue
+            terms.discard(term)
+            if not terms:
+                del self._deletes[variant]
+
+    def lookup(self, token: str, max_distance: int) -> List[Tuple[str, int]]:
+        """Terms within `max_distance` edits of `token`, closest first."""
+        max_distance = min(max_distance, self.max_distance)
+        if max_distance <= 0:
+            return []
+        candidates: Set[str] = set()
+        for variant in self._variants(token, max_distance):
+            candidates |= self._deletes.get(variant, set())
+        matches = []
+        for term in candidates:
+            distance = damerau_levenshtein(token, term, max_distance)
+            if distance <= max_distance:
+                matches.append((term, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+
+class ProductSearchIndex:
+    """Token -> product id postings with prefix lookup and relevance ranking."""
+
+    def __init__(self, products: Iterable[dict] = ()):
+        self._order: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._doc_tokens: Dict[int, Set[str]] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._fuzzy = DeletionDictionary()
+        self._next_position = 0
+        for product in products:
+            self.upsert(product)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    # ---------- maintenance ----------
+
+    def upsert(self, product: dict) -> None:
+        product_id = product["id"]
+        if product_id in self._order:
+            self._unindex(product_id)
+        else:
+            self._order[product_id] = self._next_position
+            self._next_position += 1
+
+        weights: Dict[str, float] = {}
+        for field, weight in INDEXED_FIELDS:
+            for token, raw in index_terms(product.get(field) or ""):
+                weights[token] = weights.get(token, 0.0) + weight
+                if raw != token:
+                    weights[raw] = weights.get(raw, 0.0) + weight
+
+        for token, weight in weights.items():
+            if token not in self._postings:
+                self._vocabulary_dirty = True
+                self._fuzzy.add(token)
+            self._postings[token][product_id] = weight
+        self._doc_tokens[product_id] = set(weights)
+
+    def remove(self, product_id: int) -> None:
+        if product_id not in self._order:
+            return
+        self._unindex(product_id)
+        del self._order[product_id]
+
+    def _unindex(self, product_id: int) -> None:
+        for token in self._doc_tokens.pop(product_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+                self._fuzzy.discard(token)
+
+    def _sorted_vocabulary(self) -> List[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        return self._vocabulary
+
+    # ---------- queries ----------
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Indexed tokens matching `token` exactly or as a prefix, else within a few typos."""
+        vocabulary = self._sorted_vocabulary()
+        matches = []
+        i = bisect_left(vocabulary, token)
+        while i < len(vocabulary) and vocabulary[i].startswith(token):
+            term = vocabulary[i]
+            matches.append((term, EXACT_MATCH_BOOST if term == token else PREFIX_MATCH_BOOST))
+            i += 1
+        if matches:
+            return matches
+        return [
+            (term, FUZZY_MATCH_BOOST / distance)
+            for term, distance in self._fuzzy.lookup(token, max_edit_distance(token))
+        ]
+
+    def _token_scores(self, token: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        total = len(self._order) or 1
+        for term, boost in self._expand(token):
+            postings = self._postings[term]
+            idf = log(1 + total / len(postings))
+            for product_id, weight in postings.items():
+                score = boost * weight * idf
+                if score > scores.get(product_id, 0.0):
+                    scores[product_id] = score
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """Ids of products matching every query token, best match first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        scores_by_token = {token: self._token_scores(token) for token in tokens}
+        stem = unfinished_article_stem(query)
+        if stem is not None:
+            # "الح" may still become "الحقيبة"; match words without the article too
+            last = scores_by_token[tokens[-1]]
+            for product_id, score in self._token_scores(stem).items():
+                if score > last.get(product_id, 0.0):
+                    last[product_id] = score
+        per_token = list(scores_by_token.values())
+        per_token.sort(key=len)
+        if not per_token[0]:
+            return []
+
+        # Intersect starting from the rarest token so work is bounded by the match count
+        scores = dict(per_token[0])
+        for token_scores in per_token[1:]:
+            scores = {pid: s + token_scores[pid] for pid, s in scores.items() if pid in token_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores, key=lambda pid: (-scores[pid], self._order[pid]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return ranked
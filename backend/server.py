@@ -1,49 +1,221 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Depends, Query, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
+import asyncio
+import base64
+import functools
+import json
 import logging
+import math
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict, Set
 import uuid
 from datetime import datetime, timezone, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from emergentintegrations.payments.stripe.checkout import (
-    StripeCheckout, 
-    CheckoutSessionResponse, 
-    CheckoutStatusResponse, 
-    CheckoutSessionRequest
+
+from catalog_cache import CatalogCache, seed_catalog
+from password_hashing import PasswordHasher, PasswordHasherSaturated
+from rate_limit import BucketRule, MemoryBucketStore, MongoBucketStore, RateLimiter, client_ip
+from caching import SingleFlight, TTLCache
+from stripe_client import StripeCheckoutPool, configure_stripe_http
+from db_indexes import bootstrap_indexes
+from webhook_queue import WebhookEventQueue
+from ndjson import ndjson_response, wants_ndjson
+from batch import run_batch
+from http_cache import cached_json_response
+from compression import CompressionMiddleware
+from json_encoding import FastJSONResponse, FastJSONRoute
+from autocomplete import MAX_SUGGESTIONS
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    SLOW_CALL_BUCKETS,
+    CallbackMetric,
+    EventLoopLagMonitor,
+    MetricsMiddleware,
+    MongoCommandMetrics,
+    Registry,
 )
+from profiling import ProfilerBusy, ProfilingMiddleware, StackSampler, collapsed, token_matches
+from warmup import WarmUp
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# Metrics, served at /metrics
+metrics_registry = Registry()
+http_request_seconds = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+mongo_command_seconds = metrics_registry.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command",
+    ["collection", "command", "outcome"],
+)
+bcrypt_seconds = metrics_registry.histogram(
+    "bcrypt_duration_seconds", "Password hash/verify latency, including time queued for a worker",
+    ["operation"], buckets=SLOW_CALL_BUCKETS,
+)
+stripe_call_seconds = metrics_registry.histogram(
+    "stripe_call_duration_seconds", "Stripe checkout call latency",
+    ["operation"], buckets=SLOW_CALL_BUCKETS,
+)
+event_loop_lag_seconds = metrics_registry.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer scheduled every 0.5s",
+)
+
+# MongoDB connection, one client per app (see Services)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+db_name = os.environ['DB_NAME']
+# Connections opened at startup and kept open, so early requests don't wait on handshakes
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '5'))
 
 # JWT Configuration
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production-7777')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# How often each worker checks MongoDB for a new catalog version
+CATALOG_REFRESH_SECONDS = float(os.environ.get('CATALOG_REFRESH_SECONDS', '30'))
+
+# Browsers and CDNs may reuse catalog responses this long, then revalidate by ETag
+CATALOG_CACHE_CONTROL = os.environ.get(
+    'CATALOG_CACHE_CONTROL', 'public, max-age=60, stale-while-revalidate=300'
+)
+
+# Password hashing, off the event loop in a bounded pool
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '64'))
+
+# Login/register rate limits, checked before any bcrypt work. RATE_LIMIT_BACKEND=mongo
+# shares the buckets between workers; the default keeps them per worker.
+AUTH_RATE_LIMITS = {
+    "login_ip": BucketRule(capacity=20, per_seconds=60),
+    "login_email": BucketRule(capacity=5, per_seconds=300),
+    "register_ip": BucketRule(capacity=10, per_seconds=600),
+}
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+# Proxies in front of the app that append to X-Forwarded-For. Set to 1 behind the
+# ingress; left at 0 the header is ignored, since without a proxy clients write it
+# themselves and could rotate it to dodge the per-IP limits.
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+
+# Stripe: one pooled HTTP session and one StripeCheckout per worker
+STRIPE_HTTP_TIMEOUT_SECONDS = float(os.environ.get('STRIPE_HTTP_TIMEOUT_SECONDS', '20'))
+STRIPE_HTTP_POOL_SIZE = int(os.environ.get('STRIPE_HTTP_POOL_SIZE', '20'))
+STRIPE_MAX_NETWORK_RETRIES = int(os.environ.get('STRIPE_MAX_NETWORK_RETRIES', '2'))
+stripe_checkout_pool = StripeCheckoutPool(
+    os.environ.get('STRIPE_API_KEY'),
+    webhook_path="/api/webhook/stripe",
+    # Public URL of the API (e.g. https://shop.example.com); unset, the request's Host is used
+    public_base_url=os.environ.get('PUBLIC_BASE_URL'),
+)
+# Verified Stripe events are queued, deduplicated by event id and applied in batches
+WEBHOOK_QUEUE_SIZE = int(os.environ.get('WEBHOOK_QUEUE_SIZE', '10000'))
+WEBHOOK_BATCH_SIZE = int(os.environ.get('WEBHOOK_BATCH_SIZE', '100'))
+WEBHOOK_FLUSH_SECONDS = float(os.environ.get('WEBHOOK_FLUSH_SECONDS', '0.5'))
+
+# Profiling live workers: GET /debug/profile with an X-Profiler-Token header, or any
+# request with an X-Profile-Request header. Both are disabled unless PROFILER_TOKEN is set.
+PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
+MAX_PROFILE_SECONDS = 60
+stack_sampler = StackSampler()
+
+# Responses at least this large are compressed; cached catalog payloads are precompressed from the same size
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get('COMPRESSION_MINIMUM_SIZE', '1024'))
 
 # Security
 security = HTTPBearer(auto_error=False)
 
-# Create the main app
-app = FastAPI()
+# /api/batch: sub-requests per call, and the request-state key carrying the resolved user
+MAX_BATCH_CALLS = 20
+BATCH_USER_KEY = "batch_user"
+
+# Authenticated users by id, so a token doesn't cost a users lookup on every request.
+# Routes that modify a user document must call invalidate_cached_user.
+user_cache = TTLCache(
+    maxsize=int(os.environ.get('USER_CACHE_SIZE', '10000')),
+    ttl=float(os.environ.get('USER_CACHE_TTL_SECONDS', '60')),
+)
 
 # Create router with /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=FastJSONRoute)
+
+# Operational endpoints (metrics, profiling, health), outside /api so the ingress doesn't expose them
+ops_router = APIRouter()
+
+
+# ===================== SERVICES =====================
+
+class Services:
+    """
+    Connections, pools and background tasks owned by one app. create_app builds
+    a set per app, so shutting one app down never closes another app's client
+    or hasher pool.
+    """
+
+    def __init__(self):
+        self.client = AsyncIOMotorClient(
+            mongo_url,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            event_listeners=[MongoCommandMetrics(mongo_command_seconds)],
+        )
+        self.db = self.client[db_name]
+        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.password_hasher = PasswordHasher(
+            self.pwd_context, max_workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING,
+        )
+        local_rate_buckets = MemoryBucketStore(maxsize=RATE_LIMIT_MAX_KEYS)
+        self.rate_limiter = RateLimiter(
+            MongoBucketStore(self.db, fallback=local_rate_buckets)
+            if RATE_LIMIT_BACKEND == 'mongo'
+            else local_rate_buckets
+        )
+        # In-memory catalog (columnar store, search index, autocomplete index), loaded
+        # from MongoDB at startup and refreshed when the catalog version changes.
+        # Starts from the seed data so the API can serve before the first load.
+        self.catalog_cache = CatalogCache(PRODUCTS, CATEGORIES, compression_minimum_size=COMPRESSION_MINIMUM_SIZE)
+        self.webhook_queue = WebhookEventQueue(
+            self.db, maxsize=WEBHOOK_QUEUE_SIZE, batch_size=WEBHOOK_BATCH_SIZE, flush_interval=WEBHOOK_FLUSH_SECONDS,
+        )
+        self.event_loop_lag_monitor = EventLoopLagMonitor(event_loop_lag_seconds)
+        self.closed = False
+
+    def start(self) -> None:
+        self.webhook_queue.start()
+        self.event_loop_lag_monitor.start()
+        self.catalog_cache.start_refresh(self.db, CATALOG_REFRESH_SECONDS)
+
+    async def close(self) -> None:
+        """Stop the background tasks and close the pools; calling it again is a no-op."""
+        if self.closed:
+            return
+        self.closed = True
+        await self.catalog_cache.stop_refresh()
+        await self.event_loop_lag_monitor.stop()
+        await self.webhook_queue.stop()
+        self.password_hasher.shutdown()
+        self.client.close()
+
+# Services of the apps between startup and shutdown, for the metrics callbacks
+running_services: Set[Services] = set()
+
+def get_services(request: Request) -> Services:
+    return request.app.state.services
+
+def get_db(request: Request) -> AsyncIOMotorDatabase:
+    return request.app.state.services.db
+
+def get_catalog_cache(request: Request) -> CatalogCache:
+    return request.app.state.services.catalog_cache
 
 
 # ===================== MODELS =====================
@@ -150,6 +322,18 @@ class WishlistItem(BaseModel):
     price: float
     image: str
 
+class WishlistSync(BaseModel):
+    items: List[WishlistItem] = Field(max_length=500)
+
+# Batch Models
+class BatchCall(BaseModel):
+    method: str = "GET"
+    path: str
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchCall] = Field(min_length=1, max_length=MAX_BATCH_CALLS)
+
 # Search Model
 class SearchQuery(BaseModel):
     query: str
@@ -170,11 +354,36 @@ class Product(BaseModel):
 
 # ===================== AUTH HELPERS =====================
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def _password_hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please try again",
+        headers={"Retry-After": "1"}
+    )
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def enforce_rate_limits(rate_limiter: RateLimiter, *limits: tuple) -> None:
+    """Take a token from each (rule name, key) bucket; 429 with Retry-After when one is empty."""
+    retry_after = await rate_limiter.check(*[(name, AUTH_RATE_LIMITS[name], key) for name, key in limits])
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+async def verify_password(password_hasher: PasswordHasher, plain_password: str, hashed_password: str) -> bool:
+    try:
+        with bcrypt_seconds.time("verify"):
+            return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordHasherSaturated:
+        raise _password_hasher_busy()
+
+async def get_password_hash(password_hasher: PasswordHasher, password: str) -> str:
+    try:
+        with bcrypt_seconds.time("hash"):
+            return await password_hasher.hash(password)
+    except PasswordHasherSaturated:
+        raise _password_hasher_busy()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -182,7 +391,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Optional[dict]:
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Optional[dict]:
+    # Sub-requests of /api/batch reuse the user resolved once for the whole batch
+    batch_state = request.scope.get("state", {})
+    if BATCH_USER_KEY in batch_state:
+        return batch_state[BATCH_USER_KEY]
     if not credentials:
         return None
     try:
@@ -191,19 +407,32 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         user_id: str = payload.get("sub")
         if user_id is None:
             return None
-        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+        user = user_cache.get(user_id)
+        if user is None:
+            user = await get_db(request).users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+            if user:
+                user_cache.set(user_id, user)
         return user
     except JWTError:
         return None
 
-async def require_auth(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    user = await get_current_user(credentials)
+def invalidate_cached_user(user_id: str) -> None:
+    user_cache.invalidate(user_id)
+
+async def require_auth(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    user = await get_current_user(request, credentials)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     return user
 
 
-# ===================== MOCK PRODUCTS DATA =====================
+# ===================== SEED CATALOG DATA =====================
+
+# Inserted into the products/categories collections when they are empty;
+# routes read the catalog from `catalog_cache`, never from these constants
 
 PRODUCTS = [
     {"id": 1, "name": "حقيبة جلدية فاخرة", "nameEn": "Luxury Leather Bag", "category": "bags", "price": 1299, "image": "https://images.unsplash.com/photo-1589363358751-ab05797e5629", "isNew": True},
@@ -220,6 +449,13 @@ PRODUCTS = [
     {"id": 12, "name": "جاكيت جلدي فاخر", "nameEn": "Luxury Leather Jacket", "category": "jackets", "price": 1499, "image": "https://images.unsplash.com/photo-1686491730848-0c86413833e5", "isNew": True},
 ]
 
+CATEGORIES = [
+    {"id": "bags", "name": "الحقائب", "nameEn": "Bags"},
+    {"id": "jackets", "name": "الجاكيتات", "nameEn": "Jackets"},
+    {"id": "shirts", "name": "القمصان", "nameEn": "Shirts"},
+    {"id": "pants", "name": "البناطيل", "nameEn": "Pants"},
+]
+
 
 # ===================== ROUTES =====================
 
@@ -229,7 +465,7 @@ async def root():
     return {"message": "Hello World"}
 
 @api_router.post("/status", response_model=StatusCheck)
-async def create_status_check(input: StatusCheckCreate):
+async def create_status_check(input: StatusCheckCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     doc = status_obj.model_dump()
@@ -238,7 +474,15 @@ async def create_status_check(input: StatusCheckCreate):
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
+async def get_status_checks(
+    request: Request,
+    response_format: Optional[str] = Query(None, alias="format"),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if wants_ndjson(request, response_format):
+        # Timestamps are streamed as stored (ISO strings)
+        return ndjson_response(db.status_checks.find({}, {"_id": 0}))
+    
     status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
     for check in status_checks:
         if isinstance(check['timestamp'], str):
@@ -249,7 +493,10 @@ async def get_status_checks():
 # ===================== AUTH ROUTES =====================
 
 @api_router.post("/auth/register", response_model=TokenResponse)
-async def register(user_data: UserRegister):
+async def register(request: Request, user_data: UserRegister, services: Services = Depends(get_services)):
+    db = services.db
+    await enforce_rate_limits(services.rate_limiter, ("register_ip", client_ip(request, TRUSTED_PROXY_HOPS)))
+    
     # Check if user exists
     existing = await db.users.find_one({"email": user_data.email.lower()})
     if existing:
@@ -262,14 +509,18 @@ async def register(user_data: UserRegister):
     user_doc = {
         "id": user_id,
         "email": user_data.email.lower(),
-        "password": get_password_hash(user_data.password),
+        "password": await get_password_hash(services.password_hasher, user_data.password),
         "name": user_data.name,
         "phone": user_data.phone,
         "created_at": now,
         "updated_at": now
     }
     
-    await db.users.insert_one(user_doc)
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        # A concurrent registration for the same email won the unique index
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create token
     access_token = create_access_token(data={"sub": user_id})
@@ -286,9 +537,15 @@ async def register(user_data: UserRegister):
     )
 
 @api_router.post("/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
-    user = await db.users.find_one({"email": credentials.email.lower()})
-    if not user or not verify_password(credentials.password, user["password"]):
+async def login(request: Request, credentials: UserLogin, services: Services = Depends(get_services)):
+    await enforce_rate_limits(
+        services.rate_limiter,
+        ("login_ip", client_ip(request, TRUSTED_PROXY_HOPS)),
+        ("login_email", credentials.email.lower()),
+    )
+    
+    user = await services.db.users.find_one({"email": credentials.email.lower()})
+    if not user or not await verify_password(services.password_hasher, credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     access_token = create_access_token(data={"sub": user["id"]})
@@ -318,7 +575,8 @@ async def get_me(user: dict = Depends(require_auth)):
 async def update_profile(
     name: Optional[str] = None,
     phone: Optional[str] = None,
-    user: dict = Depends(require_auth)
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     update_data = {"updated_at": datetime.now(timezone.utc).isoformat()}
     if name:
@@ -327,6 +585,7 @@ async def update_profile(
         update_data["phone"] = phone
     
     await db.users.update_one({"id": user["id"]}, {"$set": update_data})
+    invalidate_cached_user(user["id"])
     return {"message": "Profile updated successfully"}
 
 
@@ -337,90 +596,128 @@ async def search_products(
     q: str = "",
     category: Optional[str] = None,
     min_price: Optional[float] = None,
-    max_price: Optional[float] = None
+    max_price: Optional[float] = None,
+    catalog_cache: CatalogCache = Depends(get_catalog_cache)
 ):
-    results = []
-    query_lower = q.lower()
+    # Text search (name in Arabic or English), ranked by relevance
+    catalog = catalog_cache.catalog
+    candidates = catalog.rows_for_ids(catalog_cache.search_index.search(q)) if q.strip() else None
     
-    for product in PRODUCTS:
-        # Text search (name in Arabic or English)
-        if query_lower and query_lower not in product["name"].lower() and query_lower not in product["nameEn"].lower():
-            continue
-        
-        # Category filter
-        if category and product["category"] != category:
-            continue
-        
-        # Price filters
-        if min_price and product["price"] < min_price:
-            continue
-        if max_price and product["price"] > max_price:
-            continue
-        
-        results.append(product)
+    # Category and price filters as vectorized masks over the catalog columns
+    rows = catalog.filter(category, min_price, max_price, rows=candidates)
+    results = catalog.records(rows)
     
     return {"products": results, "total": len(results)}
 
+@api_router.get("/products/suggest")
+async def suggest_products(
+    q: str = "",
+    limit: int = Query(8, ge=1, le=MAX_SUGGESTIONS),
+    catalog_cache: CatalogCache = Depends(get_catalog_cache)
+):
+    return {"suggestions": catalog_cache.suggestions.suggest(q, limit)}
+
 @api_router.get("/products/{product_id}")
-async def get_product(product_id: int):
-    for product in PRODUCTS:
-        if product["id"] == product_id:
-            return product
-    raise HTTPException(status_code=404, detail="Product not found")
+async def get_product(request: Request, product_id: int, catalog_cache: CatalogCache = Depends(get_catalog_cache)):
+    product = catalog_cache.catalog.get(product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    payload = catalog_cache.payload(("product", product_id), lambda: product)
+    return cached_json_response(request, payload, CATALOG_CACHE_CONTROL)
 
 @api_router.get("/products")
-async def get_all_products(category: Optional[str] = None):
-    if category:
-        return {"products": [p for p in PRODUCTS if p["category"] == category]}
-    return {"products": PRODUCTS}
+async def get_all_products(
+    request: Request,
+    category: Optional[str] = None,
+    catalog_cache: CatalogCache = Depends(get_catalog_cache)
+):
+    category = category or None
+    if category and not catalog_cache.catalog.has_category(category):
+        return {"products": []}
+    payload = catalog_cache.payload(
+        ("products", category),
+        lambda: {"products": catalog_cache.catalog.partition(category)}
+    )
+    return cached_json_response(request, payload, CATALOG_CACHE_CONTROL)
 
 @api_router.get("/categories")
-async def get_categories():
-    return {
-        "categories": [
-            {"id": "bags", "name": "الحقائب", "nameEn": "Bags"},
-            {"id": "jackets", "name": "الجاكيتات", "nameEn": "Jackets"},
-            {"id": "shirts", "name": "القمصان", "nameEn": "Shirts"},
-            {"id": "pants", "name": "البناطيل", "nameEn": "Pants"},
-        ]
-    }
+async def get_categories(request: Request, catalog_cache: CatalogCache = Depends(get_catalog_cache)):
+    payload = catalog_cache.payload(("categories",), lambda: {"categories": catalog_cache.categories})
+    return cached_json_response(request, payload, CATALOG_CACHE_CONTROL)
 
 
 # ===================== WISHLIST ROUTES =====================
 
 @api_router.get("/wishlist")
-async def get_wishlist(user: dict = Depends(require_auth)):
+async def get_wishlist(
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
     wishlist = await db.wishlists.find_one({"user_id": user["id"]}, {"_id": 0})
     if not wishlist:
         return {"items": []}
     return {"items": wishlist.get("items", [])}
 
 @api_router.post("/wishlist/add")
-async def add_to_wishlist(item: WishlistItem, user: dict = Depends(require_auth)):
-    wishlist = await db.wishlists.find_one({"user_id": user["id"]})
-    
-    if not wishlist:
-        await db.wishlists.insert_one({
-            "user_id": user["id"],
-            "items": [item.model_dump()],
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        })
-    else:
-        # Check if item already exists
-        existing = [i for i in wishlist.get("items", []) if i["product_id"] == item.product_id]
-        if not existing:
-            await db.wishlists.update_one(
-                {"user_id": user["id"]},
-                {
-                    "$push": {"items": item.model_dump()},
-                    "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
-                }
-            )
+async def add_to_wishlist(
+    item: WishlistItem,
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    # One atomic upsert on the user's list; the item is appended only when its
+    # product isn't already there, so retries and double clicks add it once
+    already_listed = {"$in": [item.product_id, {"$ifNull": ["$items.product_id", []]}]}
+    await db.wishlists.update_one(
+        {"user_id": user["id"]},
+        [{"$set": {
+            "items": {"$cond": [
+                already_listed,
+                "$items",
+                {"$concatArrays": [{"$ifNull": ["$items", []]}, [{"$literal": item.model_dump()}]]}
+            ]},
+            "updated_at": {"$cond": [already_listed, "$updated_at", datetime.now(timezone.utc).isoformat()]}
+        }}],
+        upsert=True
+    )
     
     return {"message": "Added to wishlist"}
 
+@api_router.post("/wishlist/sync")
+async def sync_wishlist(
+    sync: WishlistSync,
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    # Merge client-side items (first occurrence wins) into the stored list in one write
+    incoming = {}
+    for item in sync.items:
+        incoming.setdefault(item.product_id, item.model_dump())
+    stored_ids = {"$ifNull": ["$items.product_id", []]}
+    
+    wishlist = await db.wishlists.find_one_and_update(
+        {"user_id": user["id"]},
+        [{"$set": {
+            "items": {"$concatArrays": [
+                {"$ifNull": ["$items", []]},
+                {"$filter": {
+                    "input": {"$literal": list(incoming.values())},
+                    "cond": {"$not": [{"$in": ["$$this.product_id", stored_ids]}]}
+                }}
+            ]},
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }}],
+        projection={"_id": 0, "items": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return {"items": wishlist.get("items", [])}
+
 @api_router.delete("/wishlist/{product_id}")
-async def remove_from_wishlist(product_id: int, user: dict = Depends(require_auth)):
+async def remove_from_wishlist(
+    product_id: int,
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
     await db.wishlists.update_one(
         {"user_id": user["id"]},
         {
@@ -434,12 +731,24 @@ async def remove_from_wishlist(product_id: int, user: dict = Depends(require_aut
 # ===================== ADDRESS ROUTES =====================
 
 @api_router.get("/addresses")
-async def get_addresses(user: dict = Depends(require_auth)):
+async def get_addresses(
+    request: Request,
+    response_format: Optional[str] = Query(None, alias="format"),
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if wants_ndjson(request, response_format):
+        return ndjson_response(db.addresses.find({"user_id": user["id"]}, {"_id": 0}))
+    
     addresses = await db.addresses.find({"user_id": user["id"]}, {"_id": 0}).to_list(100)
     return {"addresses": addresses}
 
 @api_router.post("/addresses", response_model=AddressResponse)
-async def add_address(address: AddressCreate, user: dict = Depends(require_auth)):
+async def add_address(
+    address: AddressCreate,
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
     address_id = str(uuid.uuid4())
     
     # If this is the first address or marked as default, set others to non-default
@@ -461,7 +770,11 @@ async def add_address(address: AddressCreate, user: dict = Depends(require_auth)
     return AddressResponse(id=address_id, **address.model_dump())
 
 @api_router.delete("/addresses/{address_id}")
-async def delete_address(address_id: str, user: dict = Depends(require_auth)):
+async def delete_address(
+    address_id: str,
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
     result = await db.addresses.delete_one({"id": address_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Address not found")
@@ -470,16 +783,87 @@ async def delete_address(address_id: str, user: dict = Depends(require_auth)):
 
 # ===================== ORDER HISTORY ROUTES =====================
 
+# List view only needs the header fields and a few items for thumbnails;
+# the full order (all items, shipping address) comes from get_order.
+# items_count tells clients how many items the preview leaves out.
+ORDER_PREVIEW_ITEMS = 3
+# Orders per page when the client doesn't pass `limit`
+ORDER_PAGE_SIZE = 20
+ORDER_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "status": 1,
+    "payment_status": 1,
+    "total": 1,
+    "currency": 1,
+    "created_at": 1,
+    "items": {"$slice": [{"$ifNull": ["$items", []]}, ORDER_PREVIEW_ITEMS]},
+    "items_count": {"$size": {"$ifNull": ["$items", []]}},
+}
+
+def _encode_order_cursor(order: dict) -> str:
+    raw = json.dumps([order["created_at"], order["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_order_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, order_id = json.loads(raw)
+        if not isinstance(created_at, str) or not isinstance(order_id, str):
+            raise ValueError("malformed cursor")
+        return created_at, order_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @api_router.get("/orders")
-async def get_orders(user: dict = Depends(require_auth)):
-    orders = await db.orders.find(
-        {"user_id": user["id"]}, 
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    return {"orders": orders}
+async def get_orders(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    response_format: Optional[str] = Query(None, alias="format"),
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    query = {"user_id": user["id"]}
+    if cursor:
+        # Keyset pagination on (created_at, id), newest first
+        created_at, order_id = _decode_order_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": order_id}},
+        ]
+    
+    # Aggregation rather than find: $size is not a find projection operator
+    # before MongoDB 4.4
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"created_at": -1, "id": -1}},
+    ]
+    
+    if wants_ndjson(request, response_format):
+        # Streams from the cursor position on: `limit` orders when given, else the
+        # rest of the history
+        if limit is not None:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$project": ORDER_SUMMARY_PROJECTION})
+        return ndjson_response(db.orders.aggregate(pipeline))
+    
+    limit = limit or ORDER_PAGE_SIZE
+    pipeline += [{"$limit": limit + 1}, {"$project": ORDER_SUMMARY_PROJECTION}]
+    orders = await db.orders.aggregate(pipeline).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = _encode_order_cursor(orders[-1])
+    return {"orders": orders, "next_cursor": next_cursor}
 
 @api_router.get("/orders/{order_id}")
-async def get_order(order_id: str, user: dict = Depends(require_auth)):
+async def get_order(
+    order_id: str,
+    user: dict = Depends(require_auth),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
     order = await db.orders.find_one(
         {"id": order_id, "user_id": user["id"]},
         {"_id": 0}
@@ -491,21 +875,32 @@ async def get_order(order_id: str, user: dict = Depends(require_auth)):
 
 # ===================== CHECKOUT ROUTES =====================
 
+# Success-page polling: short-lived status cache plus per-session request coalescing
+TERMINAL_CHECKOUT_STATUSES = {"complete", "expired"}
+TERMINAL_PAYMENT_STATUSES = {"paid"}
+checkout_status_cache = TTLCache(
+    maxsize=10000,
+    ttl=float(os.environ.get('CHECKOUT_STATUS_CACHE_TTL_SECONDS', '3')),
+)
+checkout_status_recorded = TTLCache(maxsize=10000, ttl=3600)
+checkout_status_flights = SingleFlight()
+
+def get_stripe_checkout(request: Request):
+    if not stripe_checkout_pool.api_key:
+        raise HTTPException(status_code=500, detail="Stripe API key not configured")
+    return stripe_checkout_pool.get(str(request.base_url))
+
 @api_router.post("/checkout/create-session")
 async def create_checkout_session(
     request: Request, 
     checkout_req: CheckoutRequest,
-    user: Optional[dict] = Depends(get_current_user)
+    user: Optional[dict] = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
+    from emergentintegrations.payments.stripe.checkout import CheckoutSessionRequest, CheckoutSessionResponse
+    
     try:
-        stripe_api_key = os.environ.get('STRIPE_API_KEY')
-        if not stripe_api_key:
-            raise HTTPException(status_code=500, detail="Stripe API key not configured")
-        
-        host_url = str(request.base_url).rstrip('/')
-        webhook_url = f"{host_url}/api/webhook/stripe"
-        
-        stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url=webhook_url)
+        stripe_checkout = get_stripe_checkout(request)
         
         total_amount = sum(item.price * item.quantity for item in checkout_req.items)
         
@@ -527,7 +922,8 @@ async def create_checkout_session(
             metadata=metadata
         )
         
-        session: CheckoutSessionResponse = await stripe_checkout.create_checkout_session(checkout_request)
+        with stripe_call_seconds.time("create_checkout_session"):
+            session: CheckoutSessionResponse = await stripe_checkout.create_checkout_session(checkout_request)
         
         # Create order and transaction records
         order_id = str(uuid.uuid4())
@@ -580,45 +976,64 @@ async def create_checkout_session(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _record_checkout_status(db: AsyncIOMotorDatabase, session_id: str, status: str, payment_status: str) -> None:
+    """Persist a polled status, skipping the writes when nothing changed."""
+    if checkout_status_recorded.get(session_id) == (status, payment_status):
+        return
+    
+    update_data = {
+        "status": status,
+        "payment_status": payment_status,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+    changed = {"session_id": session_id, "$or": [
+        {"status": {"$ne": status}},
+        {"payment_status": {"$ne": payment_status}},
+    ]}
+    
+    await db.payment_transactions.update_one(changed, {"$set": update_data})
+    await db.orders.update_one(changed, {"$set": update_data})
+    checkout_status_recorded.set(session_id, (status, payment_status))
+
+async def _fetch_checkout_status(request: Request, session_id: str) -> dict:
+    from emergentintegrations.payments.stripe.checkout import CheckoutStatusResponse
+    
+    stripe_checkout = get_stripe_checkout(request)
+    
+    with stripe_call_seconds.time("get_checkout_status"):
+        checkout_status: CheckoutStatusResponse = await stripe_checkout.get_checkout_status(session_id)
+    
+    # Update transaction and order status
+    await _record_checkout_status(get_db(request), session_id, checkout_status.status, checkout_status.payment_status)
+    
+    result = {
+        "status": checkout_status.status,
+        "payment_status": checkout_status.payment_status,
+        "amount_total": checkout_status.amount_total,
+        "currency": checkout_status.currency,
+        "metadata": checkout_status.metadata
+    }
+    
+    # A finished session never changes again, so keep it until evicted
+    terminal = (
+        checkout_status.status in TERMINAL_CHECKOUT_STATUSES
+        or checkout_status.payment_status in TERMINAL_PAYMENT_STATUSES
+    )
+    checkout_status_cache.set(session_id, result, ttl=None if terminal else checkout_status_cache.ttl)
+    return result
+
 @api_router.get("/checkout/status/{session_id}")
 async def get_checkout_status(request: Request, session_id: str):
+    cached = checkout_status_cache.get(session_id)
+    if cached is not None:
+        return cached
+    
     try:
-        stripe_api_key = os.environ.get('STRIPE_API_KEY')
-        if not stripe_api_key:
-            raise HTTPException(status_code=500, detail="Stripe API key not configured")
-        
-        host_url = str(request.base_url).rstrip('/')
-        webhook_url = f"{host_url}/api/webhook/stripe"
-        
-        stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url=webhook_url)
-        
-        checkout_status: CheckoutStatusResponse = await stripe_checkout.get_checkout_status(session_id)
-        
-        # Update transaction and order status
-        update_data = {
-            "status": checkout_status.status,
-            "payment_status": checkout_status.payment_status,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }
-        
-        await db.payment_transactions.update_one(
-            {"session_id": session_id},
-            {"$set": update_data}
-        )
-        
-        await db.orders.update_one(
-            {"session_id": session_id},
-            {"$set": update_data}
+        # Concurrent polls for one session share a single Stripe call
+        return await checkout_status_flights.do(
+            session_id, lambda: _fetch_checkout_status(request, session_id)
         )
         
-        return {
-            "status": checkout_status.status,
-            "payment_status": checkout_status.payment_status,
-            "amount_total": checkout_status.amount_total,
-            "currency": checkout_status.currency,
-            "metadata": checkout_status.metadata
-        }
-        
     except Exception as e:
         logging.error(f"Error getting checkout status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -627,36 +1042,22 @@ async def get_checkout_status(request: Request, session_id: str):
 @api_router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
     try:
-        stripe_api_key = os.environ.get('STRIPE_API_KEY')
-        if not stripe_api_key:
-            raise HTTPException(status_code=500, detail="Stripe API key not configured")
-        
-        host_url = str(request.base_url).rstrip('/')
-        webhook_url = f"{host_url}/api/webhook/stripe"
-        
-        stripe_checkout = StripeCheckout(api_key=stripe_api_key, webhook_url=webhook_url)
+        stripe_checkout = get_stripe_checkout(request)
         
         body = await request.body()
         signature = request.headers.get("Stripe-Signature")
         
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
+        with stripe_call_seconds.time("handle_webhook"):
+            webhook_response = await stripe_checkout.handle_webhook(body, signature)
         
+        # Acknowledge quickly; order/transaction updates are applied in batches
         if webhook_response.event_type == "checkout.session.completed":
-            update_data = {
-                "status": "completed",
-                "payment_status": webhook_response.payment_status,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }
-            
-            await db.payment_transactions.update_one(
-                {"session_id": webhook_response.session_id},
-                {"$set": update_data}
-            )
-            
-            await db.orders.update_one(
-                {"session_id": webhook_response.session_id},
-                {"$set": update_data}
-            )
+            await get_services(request).webhook_queue.submit({
+                "event_id": webhook_response.event_id,
+                "event_type": webhook_response.event_type,
+                "session_id": webhook_response.session_id,
+                "payment_status": webhook_response.payment_status
+            })
         
         return {"status": "processed"}
         
@@ -665,17 +1066,70 @@ async def stripe_webhook(request: Request):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-# Include router
-app.include_router(api_router)
+# ===================== BATCH ROUTE =====================
+
+@api_router.post("/batch")
+async def batch(
+    request: Request,
+    batch_req: BatchRequest,
+    user: Optional[dict] = Depends(get_current_user)
+):
+    calls = []
+    for call in batch_req.requests:
+        method = call.method.upper()
+        path = call.path
+        if not path.startswith("/api/") or path.split("?")[0].rstrip("/") == "/api/batch":
+            raise HTTPException(status_code=400, detail=f"Invalid batch path: {path}")
+        calls.append({"method": method, "path": path, "body": call.body})
+    
+    # Authenticated once here; sub-requests read the user from request state
+    responses = await run_batch(api_router, request.scope, calls, {BATCH_USER_KEY: user})
+    return {"responses": responses}
+
+
+# ===================== METRICS =====================
+
+def _cache_stats(stat: str) -> Dict[tuple, float]:
+    caches = {"user": user_cache, "checkout_status": checkout_status_cache}
+    return {(name,): cache.stats()[stat] for name, cache in caches.items()}
+
+metrics_registry.register(CallbackMetric(
+    "cache_hits_total", "In-process cache hits", "counter", ["cache"], lambda: _cache_stats("hits"),
+))
+metrics_registry.register(CallbackMetric(
+    "cache_misses_total", "In-process cache misses", "counter", ["cache"], lambda: _cache_stats("misses"),
+))
+metrics_registry.register(CallbackMetric(
+    "cache_entries", "In-process cache size", "gauge", ["cache"], lambda: _cache_stats("size"),
+))
+metrics_registry.register(CallbackMetric(
+    "password_hash_pending", "Password hash/verify calls running or queued", "gauge", [],
+    lambda: {(): sum(services.password_hasher.pending for services in running_services)},
+))
+
+# Scraped from inside the cluster
+@ops_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+# ===================== PROFILING =====================
+
+@ops_router.get("/debug/profile", include_in_schema=False)
+async def profile_worker(
+    request: Request,
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+):
+    # Collapsed stacks of every thread on this worker, for flamegraph.pl or speedscope
+    if not token_matches(request.headers.get("X-Profiler-Token"), PROFILER_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        counts = await asyncio.to_thread(stack_sampler.sample, seconds, interval_ms / 1000)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
+    return Response(content=collapsed(counts), media_type="text/plain")
 
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
 # Logging
 logging.basicConfig(
@@ -684,6 +1138,107 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+# ===================== HEALTH =====================
+
+@ops_router.get("/health/live", include_in_schema=False)
+async def liveness():
+    # The event loop is answering; dependencies are /health/ready's job
+    return {"status": "alive"}
+
+@ops_router.get("/health/ready", include_in_schema=False)
+async def readiness(request: Request):
+    report = request.app.state.warm_up.report()
+    return FastJSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+# ===================== APP FACTORY =====================
+
+async def warm_mongo(app: FastAPI):
+    await app.state.services.client.admin.command("ping")
+
+async def warm_bcrypt(app: FastAPI):
+    await app.state.services.password_hasher.warm_up()
+
+async def warm_catalog(app: FastAPI):
+    services = app.state.services
+    await seed_catalog(services.db, PRODUCTS, CATEGORIES)
+    await services.catalog_cache.load(services.db)
+
+async def warm_stripe(app: FastAPI):
+    if stripe_checkout_pool.api_key:
+        # Deferred at module import (see stripe_client); loaded here before the first checkout
+        import emergentintegrations.payments.stripe.checkout  # noqa: F401
+
+async def on_startup(app: FastAPI):
+    services = app.state.services
+    if services.closed:
+        # Started again after a shutdown; a closed client or executor can't be reopened
+        services = app.state.services = Services()
+    app.state.stripe_http = configure_stripe_http(
+        timeout=STRIPE_HTTP_TIMEOUT_SECONDS,
+        pool_size=STRIPE_HTTP_POOL_SIZE,
+        max_network_retries=STRIPE_MAX_NETWORK_RETRIES,
+        api_base=os.environ.get('STRIPE_API_BASE'),
+    )
+    # Runs in the background; query shapes without an index are logged when it finishes
+    app.state.index_bootstrap = asyncio.create_task(bootstrap_indexes(services.db))
+    services.start()
+    running_services.add(services)
+    # Also in the background, so an unreachable MongoDB doesn't hold up startup;
+    # /health/ready gates traffic, and until the catalog loads the seed catalog is served
+    app.state.warm_up.start()
+
+async def on_shutdown(app: FastAPI):
+    # Only this app's services; other apps built by create_app keep theirs
+    await app.state.warm_up.stop()
+    app.state.index_bootstrap.cancel()
+    services = app.state.services
+    running_services.discard(services)
+    await services.close()
+    app.state.stripe_http.close()
+
+def create_app() -> FastAPI:
+    """
+    Build the ASGI app with its own services (app.state.services). Run with
+    `uvicorn server:app`, or `uvicorn --factory server:create_app`.
+    """
+    app = FastAPI(default_response_class=FastJSONResponse)
+    
+    app.include_router(api_router)
+    app.include_router(ops_router)
+
+    # Compression; precompressed catalog payloads already carry Content-Encoding and pass through
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MINIMUM_SIZE,
+    )
+
+    # CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Per-request cProfile output for requests carrying the profiler token
+    app.add_middleware(ProfilingMiddleware, token=PROFILER_TOKEN)
+
+    # Request latency, outermost so it covers the other middleware too
+    app.add_middleware(MetricsMiddleware, histogram=http_request_seconds)
+
+    app.state.services = Services()
+
+    # Steps that must succeed before /health/ready reports ready
+    app.state.warm_up = WarmUp({
+        name: functools.partial(step, app)
+        for name, step in [
+            ("mongo", warm_mongo), ("bcrypt", warm_bcrypt), ("catalog", warm_catalog), ("stripe", warm_stripe),
+        ]
+    })
+    app.add_event_handler("startup", functools.partial(on_startup, app))
+    app.add_event_handler("shutdown", functools.partial(on_shutdown, app))
+    return app
+
+app = create_app()
@@ -0,0 +1,75 @@
+"""
+Long-lived Stripe client for the checkout routes.
+
+`configure_stripe_http` installs one pooled, keep-alive HTTP session as the
+Stripe SDK's default client, and `StripeCheckoutPool` hands out one
+`StripeCheckout` per public base URL instead of building one per request.
+With a configured public base URL there is exactly one; otherwise the base
+URL comes from the Host header and the most recently used ones are kept.
+Pointing `api_base` at `tests/stripe_stub.py` runs the whole path offline.
+
+The Stripe SDK, requests and emergentintegrations are imported on first use
+rather than with this module, keeping them out of worker import time.
+"""
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+# Without a public base URL, keys come from the Host header, so cap how many clients are kept
+MAX_POOLED_CLIENTS = 8
+
+
+def configure_stripe_http(
+    timeout: float,
+    pool_size: int,
+    max_network_retries: int,
+    api_base: Optional[str] = None,
+) -> "requests.Session":
+    import requests
+    import stripe
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    stripe.default_http_client = stripe.RequestsClient(timeout=timeout, session=session)
+    stripe.max_network_retries = max_network_retries
+    if api_base:
+        stripe.api_base = api_base.rstrip("/")
+    return session
+
+
+class StripeCheckoutPool:
+    def __init__(
+        self,
+        api_key: Optional[str],
+        webhook_path: str,
+        public_base_url: Optional[str] = None,
+        maxsize: int = MAX_POOLED_CLIENTS,
+    ):
+        self.api_key = api_key
+        self.webhook_path = webhook_path
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        self.maxsize = maxsize
+        self._clients: "OrderedDict[str, object]" = OrderedDict()
+
+    def get(self, base_url: str):
+        """The shared StripeCheckout for requests arriving on `base_url`."""
+        base_url = self.public_base_url or base_url.rstrip("/")
+        client = self._clients.get(base_url)
+        if client is None:
+            from emergentintegrations.payments.stripe.checkout import StripeCheckout
+
+            client = self._clients[base_url] = StripeCheckout(
+                api_key=self.api_key, webhook_url=f"{base_url}{self.webhook_path}"
+            )
+            # Made-up Host headers only evict each other, never switch pooling off
+            if len(self._clients) > self.maxsize:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(base_url)
+        return client
@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Let tests import the backend modules (server helpers, stripe_client, ...) directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="module")
+def server():
+    """`server` on the benchmark stand-ins (mongomock, stub StripeCheckout)."""
+    from benchmarks.harness import load_server
+    return load_server()
@@ -0,0 +1,130 @@
+"""
+Local stand-in for the Stripe API, enough for the checkout session routes.
+
+Run it next to the backend and point STRIPE_API_BASE at it:
+
+    python tests/stripe_stub.py --port 12111
+    STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_API_KEY=sk_test_stub uvicorn server:app
+
+It speaks HTTP/1.1 keep-alive and counts accepted connections, so tests can
+check that the pooled client reuses them.
+"""
+import argparse
+import json
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+SESSION_PATH_RE = re.compile(r"^/v1/checkout/sessions/([\w-]+)$")
+COMPLETE_PATH_RE = re.compile(r"^/_stub/complete/([\w-]+)$")
+
+
+def _unflatten(form: dict) -> dict:
+    """Turn Stripe's `line_items[0][price_data][unit_amount]=...` form encoding into nested dicts."""
+    result: dict = {}
+    for key, value in form.items():
+        parts = [key.split("[", 1)[0]] + re.findall(r"\[([^\]]*)\]", key)
+        node = result
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return result
+
+
+def _amount_total(form: dict):
+    total = 0
+    for item in form.get("line_items", {}).values():
+        unit_amount = item.get("price_data", {}).get("unit_amount")
+        if unit_amount is not None:
+            total += int(unit_amount) * int(item.get("quantity", 1))
+    return total or None
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _send(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Request-Id", f"req_{uuid.uuid4().hex[:14]}")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_form(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode() if length else ""
+        return _unflatten(dict(parse_qsl(body)))
+
+    def do_POST(self):
+        form = self._read_form()
+        if self.path == "/v1/checkout/sessions":
+            session_id = f"cs_test_{uuid.uuid4().hex}"
+            session = {
+                "id": session_id,
+                "object": "checkout.session",
+                "url": f"https://checkout.stripe.test/c/pay/{session_id}",
+                "status": "open",
+                "payment_status": "unpaid",
+                "amount_total": _amount_total(form),
+                "currency": form.get("currency", "sar"),
+                "metadata": form.get("metadata", {}),
+                "success_url": form.get("success_url"),
+                "cancel_url": form.get("cancel_url"),
+            }
+            self.server.sessions[session_id] = session
+            return self._send(200, session)
+
+        match = COMPLETE_PATH_RE.match(self.path)
+        if match and match.group(1) in self.server.sessions:
+            session = self.server.sessions[match.group(1)]
+            session.update({"status": "complete", "payment_status": "paid"})
+            return self._send(200, session)
+
+        self._send(404, {"error": {"type": "invalid_request_error", "message": f"Unknown path {self.path}"}})
+
+    def do_GET(self):
+        match = SESSION_PATH_RE.match(self.path.split("?")[0])
+        if match and match.group(1) in self.server.sessions:
+            return self._send(200, self.server.sessions[match.group(1)])
+        self._send(404, {"error": {"type": "invalid_request_error", "message": "No such checkout session"}})
+
+
+class StripeStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), StripeStubHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.sessions: dict = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StripeStubServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Stripe API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    args = parser.parse_args()
+    server = StripeStubServer(args.host, args.port)
+    print(f"Stripe stub listening on {server.url}")
+    server.serve_forever()
@@ -5,6 +5,7 @@ Tests: Health check, Status API, Checkout API
 import pytest
 import requests
 import os
+import json
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -52,6 +53,19 @@ class TestStatusAPI:
         assert isinstance(data, list)
         print(f"Retrieved {len(data)} status checks")
 
+    def test_stream_status_checks_ndjson(self):
+        """Test that status checks stream as NDJSON when asked for via Accept"""
+        headers = {"Accept": "application/x-ndjson"}
+        response = requests.get(f"{BASE_URL}/api/status", headers=headers, stream=True)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+        for check in lines:
+            assert "id" in check
+            assert "client_name" in check
+        print(f"Streamed {len(lines)} status checks")
+
 
 class TestCheckoutAPI:
     """Stripe Checkout API tests"""
@@ -0,0 +1,48 @@
+"""
+App factory lifecycle tests, run on the benchmark stand-ins (mongomock, stub StripeCheckout)
+"""
+from fastapi.testclient import TestClient
+
+USER = {"email": "factory@7777.com", "password": "factory-password", "name": "Factory"}
+
+
+def register_and_login(client: TestClient) -> None:
+    response = client.post("/api/auth/register", json=USER)
+    assert response.status_code in (200, 400), response.text
+    response = client.post("/api/auth/login", json={"email": USER["email"], "password": USER["password"]})
+    assert response.status_code == 200, response.text
+
+
+class TestCreateApp:
+    """Each app owns its services, so one app's shutdown leaves the others working"""
+
+    def test_apps_have_their_own_services(self, server):
+        """Test that two apps don't share a client, hasher or catalog cache"""
+        first, second = server.create_app(), server.create_app()
+        a, b = first.state.services, second.state.services
+        assert a.client is not b.client
+        assert a.password_hasher is not b.password_hasher
+        assert a.catalog_cache is not b.catalog_cache
+
+    def test_second_app_works_after_first_shuts_down(self, server):
+        """Test that hashing and MongoDB still work in an app started after another one stopped"""
+        first, second = server.create_app(), server.create_app()
+        with TestClient(first) as client:
+            register_and_login(client)
+        assert first.state.services.closed
+
+        with TestClient(second) as client:
+            register_and_login(client)
+        print("Second app registered and logged in after the first one shut down")
+
+    def test_restarted_app_gets_fresh_services(self, server):
+        """Test that starting an app again after shutdown replaces its closed services"""
+        app = server.create_app()
+        with TestClient(app) as client:
+            register_and_login(client)
+        closed = app.state.services
+
+        with TestClient(app) as client:
+            register_and_login(client)
+            assert app.state.services is not closed and not app.state.services.closed
+        assert app.state.services.closed
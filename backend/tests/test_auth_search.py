@@ -6,6 +6,7 @@ import pytest
 import requests
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -69,6 +70,22 @@ class TestAuthRegister:
         assert "detail" in data
         print(f"Duplicate registration correctly rejected: {data['detail']}")
     
+    def test_concurrent_duplicate_registration(self):
+        """Test that simultaneous registrations for one email give one 200 and 400s, never a 500"""
+        payload = {
+            "email": f"TEST_race_{uuid.uuid4().hex[:8]}@7777.com",
+            "password": TEST_PASSWORD,
+            "name": "Race User"
+        }
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            responses = list(pool.map(
+                lambda _: requests.post(f"{BASE_URL}/api/auth/register", json=payload), range(3)
+            ))
+
+        statuses = sorted(r.status_code for r in responses)
+        assert statuses == [200, 400, 400], f"Expected one success and two 400s, got {statuses}"
+        print(f"Concurrent registrations: {statuses}")
+    
     def test_register_invalid_email_fails(self):
         """Test that invalid email format is rejected"""
         payload = {
@@ -271,7 +288,82 @@ class TestProductSearch:
         assert data["total"] == 0
         assert len(data["products"]) == 0
         print("No results search handled correctly")
-    
+
+    def test_search_multi_word_query_ranked(self):
+        """Test that every query word must match and partial words match as prefixes"""
+        response = requests.get(f"{BASE_URL}/api/products/search?q=leather%20jack")
+
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["total"] >= 1
+        for product in data["products"]:
+            name_en = product["nameEn"].lower()
+            assert "leather" in name_en and "jack" in name_en, \
+                f"Product {product['nameEn']} doesn't match every query word"
+
+        print(f"Multi-word search 'leather jack': {data['total']} products found")
+
+    def test_search_arabic_spelling_variants(self):
+        """Test that taa marbuta/haa, tatweel, diacritics and 'ال' all hit the same products"""
+        baseline = requests.get(f"{BASE_URL}/api/products/search?q=حقيبة").json()
+        assert baseline["total"] > 0
+
+        for variant in ["حقيبه", "حقيـبة", "حَقِيبَة", "الحقيبة"]:
+            response = requests.get(f"{BASE_URL}/api/products/search", params={"q": variant})
+            assert response.status_code == 200
+            data = response.json()
+            assert data["total"] == baseline["total"], f"Variant '{variant}' returned {data['total']} products"
+
+        print(f"Arabic variants all matched {baseline['total']} products")
+
+    def test_partial_input_with_article(self):
+        """Test that 'ال' followed by a partial word already matches, as shoppers type it first"""
+        baseline = requests.get(f"{BASE_URL}/api/products/search?q=حقيبة").json()
+
+        for prefix in ["الح", "الحق", "الحقي"]:
+            data = requests.get(f"{BASE_URL}/api/products/search", params={"q": prefix}).json()
+            assert data["total"] >= baseline["total"], f"'{prefix}' returned {data['total']} products"
+            suggestions = requests.get(f"{BASE_URL}/api/products/suggest", params={"q": prefix}).json()["suggestions"]
+            assert len(suggestions) > 0, f"No suggestions for '{prefix}'"
+
+        print(f"Partial article input matched at least {baseline['total']} products")
+
+    def test_search_tolerates_typos(self):
+        """Test that a misspelled query still finds the intended products"""
+        response = requests.get(f"{BASE_URL}/api/products/search?q=lether%20jakcet")
+
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["total"] >= 1
+        for product in data["products"]:
+            assert "leather jacket" in product["nameEn"].lower()
+
+        print(f"Typo search 'lether jakcet': {data['total']} products found")
+
+    def test_suggest_completes_prefix(self):
+        """Test autocomplete returns names containing a word that starts with the prefix"""
+        response = requests.get(f"{BASE_URL}/api/products/suggest?q=leat&limit=5")
+
+        assert response.status_code == 200, f"Suggest failed: {response.text}"
+        data = response.json()
+
+        assert "suggestions" in data
+        assert 0 < len(data["suggestions"]) <= 5
+        for suggestion in data["suggestions"]:
+            assert "text" in suggestion
+            assert "product_id" in suggestion
+            assert any(word.startswith("leat") for word in suggestion["text"].lower().split())
+
+        print(f"Suggest 'leat': {[s['text'] for s in data['suggestions']]}")
+
+    def test_suggest_limit_is_bounded(self):
+        """Test that an oversized limit is rejected"""
+        response = requests.get(f"{BASE_URL}/api/products/suggest?q=a&limit=1000")
+        assert response.status_code == 422
+        print("Oversized suggest limit correctly rejected")
+
     def test_get_products_by_category(self):
         """Test getting products filtered by category via /products endpoint"""
         response = requests.get(f"{BASE_URL}/api/products?category=shirts")
@@ -313,6 +405,19 @@ class TestCategories:
         assert "pants" in category_ids
         
         print(f"Get categories: {len(data['categories'])} categories returned")
+    
+    def test_categories_revalidate_with_etag(self):
+        """Test that catalog responses carry an ETag and answer 304 when it matches"""
+        response = requests.get(f"{BASE_URL}/api/categories")
+        assert response.status_code == 200
+        etag = response.headers.get("ETag")
+        assert etag, "Catalog responses should carry an ETag"
+        assert "max-age" in response.headers.get("Cache-Control", "")
+        
+        response = requests.get(f"{BASE_URL}/api/categories", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        print(f"Categories revalidated with ETag {etag}")
 
 
 class TestProductDetail:
@@ -448,6 +553,32 @@ class TestWishlist:
         
         print("Product 1 removed from wishlist and verified")
     
+    def test_sync_wishlist_merges_items(self):
+        """Test bulk sync merges client items without duplicating stored ones"""
+        global auth_token
+        
+        if not auth_token:
+            pytest.skip("No auth token available")
+        
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        requests.post(f"{BASE_URL}/api/wishlist/add", json={
+            "product_id": 2, "name": "Classic Handbag", "price": 899, "image": "https://example.com/2.jpg"
+        }, headers=headers)
+        
+        payload = {"items": [
+            {"product_id": 2, "name": "Classic Handbag", "price": 899, "image": "https://example.com/2.jpg"},
+            {"product_id": 3, "name": "Modern Shoulder Bag", "price": 749, "image": "https://example.com/3.jpg"},
+            {"product_id": 3, "name": "Modern Shoulder Bag", "price": 749, "image": "https://example.com/3.jpg"},
+        ]}
+        response = requests.post(f"{BASE_URL}/api/wishlist/sync", json=payload, headers=headers)
+        
+        assert response.status_code == 200, f"Sync wishlist failed: {response.text}"
+        product_ids = [item["product_id"] for item in response.json()["items"]]
+        assert product_ids.count(2) == 1
+        assert product_ids.count(3) == 1
+        
+        print(f"Wishlist synced: {product_ids}")
+    
     def test_wishlist_requires_auth(self):
         """Test that wishlist endpoints require authentication"""
         response = requests.get(f"{BASE_URL}/api/wishlist")
@@ -618,6 +749,29 @@ class TestOrders:
         assert "orders" in data
         print(f"User has {len(data['orders'])} orders")
     
+    def test_get_orders_paginated(self):
+        """Test order history pages with an opaque cursor and rejects a bad one"""
+        global auth_token
+        
+        if not auth_token:
+            pytest.skip("No auth token available")
+        
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = requests.get(f"{BASE_URL}/api/orders?limit=1", headers=headers)
+        
+        assert response.status_code == 200, f"Get orders failed: {response.text}"
+        data = response.json()
+        
+        assert "next_cursor" in data
+        assert len(data["orders"]) <= 1
+        for order in data["orders"]:
+            assert "shipping_address" not in order, "List view should return order summaries"
+            assert order["items_count"] >= len(order["items"]), "items_count should cover the whole order"
+        
+        response = requests.get(f"{BASE_URL}/api/orders?cursor=not-a-cursor", headers=headers)
+        assert response.status_code == 400, f"Expected 400 for bad cursor, got {response.status_code}"
+        print(f"Orders page: {len(data['orders'])} orders, next_cursor={data['next_cursor']}")
+    
     def test_get_orders_requires_auth(self):
         """Test that orders endpoint requires authentication"""
         response = requests.get(f"{BASE_URL}/api/orders")
@@ -638,5 +792,56 @@ class TestOrders:
         print("Non-existent order correctly returns 404")
 
 
+
+class TestBatch:
+    """Batch API tests"""
+    
+    def test_batch_app_load_calls(self):
+        """Test that app-load calls run in one batch with a single authentication"""
+        global auth_token
+        
+        if not auth_token:
+            pytest.skip("No auth token available")
+        
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        payload = {"requests": [
+            {"method": "GET", "path": "/api/auth/me"},
+            {"method": "GET", "path": "/api/wishlist"},
+            {"method": "GET", "path": "/api/addresses"},
+            {"method": "GET", "path": "/api/categories"},
+            {"method": "GET", "path": "/api/products?category=bags"},
+        ]}
+        response = requests.post(f"{BASE_URL}/api/batch", json=payload, headers=headers)
+        
+        assert response.status_code == 200, f"Batch failed: {response.text}"
+        responses = response.json()["responses"]
+        
+        assert len(responses) == 5
+        assert all(r["status"] == 200 for r in responses), [r["status"] for r in responses]
+        assert responses[0]["body"]["email"] == TEST_EMAIL.lower()
+        assert "items" in responses[1]["body"]
+        assert "categories" in responses[3]["body"]
+        print(f"Batch returned {len(responses)} responses")
+    
+    def test_batch_without_auth_reports_per_call_status(self):
+        """Test that protected sub-requests fail individually without a token"""
+        payload = {"requests": [
+            {"method": "GET", "path": "/api/categories"},
+            {"method": "GET", "path": "/api/wishlist"},
+        ]}
+        response = requests.post(f"{BASE_URL}/api/batch", json=payload)
+        
+        assert response.status_code == 200
+        statuses = [r["status"] for r in response.json()["responses"]]
+        assert statuses == [200, 401]
+        print(f"Unauthenticated batch statuses: {statuses}")
+    
+    def test_batch_rejects_nested_batch(self):
+        """Test that a batch cannot call /api/batch"""
+        payload = {"requests": [{"method": "POST", "path": "/api/batch", "body": {"requests": []}}]}
+        response = requests.post(f"{BASE_URL}/api/batch", json=payload)
+        assert response.status_code == 400
+        print("Nested batch correctly rejected")
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
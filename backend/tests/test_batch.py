@@ -0,0 +1,55 @@
+"""
+Batch dispatch tests, run offline against a small in-process API router
+"""
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from batch import run_batch
+
+
+def make_client() -> TestClient:
+    router = APIRouter(prefix="/api")
+
+    @router.get("/caller")
+    async def caller(request: Request):
+        return {"forwarded_for": request.headers.get("x-forwarded-for")}
+
+    @router.post("/auth/login")
+    async def login():
+        raise HTTPException(status_code=429, detail="Too many attempts", headers={"Retry-After": "7"})
+
+    @router.post("/batch")
+    async def batch(request: Request):
+        calls = (await request.json())["requests"]
+        return {"responses": await run_batch(router, request.scope, calls, {})}
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+class TestBatchDispatch:
+    """Sub-requests see the caller's headers and report their own"""
+
+    def test_forwarded_for_reaches_sub_requests(self):
+        """Test that X-Forwarded-For is forwarded so per-IP limits see the caller"""
+        payload = {"requests": [{"method": "GET", "path": "/api/caller"}]}
+        response = make_client().post("/api/batch", json=payload, headers={"X-Forwarded-For": "203.0.113.7"})
+
+        assert response.status_code == 200
+        result = response.json()["responses"][0]
+        assert result["body"]["forwarded_for"] == "203.0.113.7"
+
+    def test_retry_after_kept_on_rate_limited_sub_request(self):
+        """Test that a sub-request's 429 keeps its Retry-After header"""
+        payload = {"requests": [
+            {"method": "POST", "path": "/api/auth/login", "body": {}},
+            {"method": "GET", "path": "/api/missing"},
+        ]}
+        response = make_client().post("/api/batch", json=payload)
+
+        limited, missing = response.json()["responses"]
+        assert limited["status"] == 429
+        assert limited["headers"] == {"retry-after": "7"}
+        assert missing["status"] == 404 and missing["headers"] == {}
+        print(f"Rate-limited sub-request: {limited}")
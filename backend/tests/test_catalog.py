@@ -0,0 +1,76 @@
+"""
+Columnar catalog tests, run offline on in-memory products
+"""
+from catalog import ColumnarCatalog
+
+
+def product(product_id: int, category: str, price, is_new: bool = False) -> dict:
+    return {
+        "id": product_id,
+        "name": f"منتج {product_id}",
+        "nameEn": f"Product {product_id}",
+        "category": category,
+        "price": price,
+        "image": f"https://example.com/{product_id}.jpg",
+        "isNew": is_new,
+    }
+
+
+PRODUCTS = [
+    product(1, "bags", 1299, is_new=True),
+    product(2, "bags", 899),
+    product(3, "jackets", 1599.5),
+    product(4, "shoes", 450),
+    product(5, "jackets", 899),
+]
+
+
+def ids(catalog: ColumnarCatalog, rows) -> list:
+    return [int(catalog.ids[row]) for row in rows]
+
+
+class TestColumnarCatalog:
+    """Filters and lookups over the columnar catalog"""
+
+    def test_records_round_trip(self):
+        """Test that records come back as stored, with whole prices kept as ints"""
+        catalog = ColumnarCatalog(PRODUCTS)
+        assert catalog.get(1) == PRODUCTS[0]
+        assert catalog.get(3)["price"] == 1599.5
+        assert isinstance(catalog.get(2)["price"], int)
+        assert catalog.get(99) is None
+        assert len(catalog) == 5
+
+    def test_category_and_price_filters(self):
+        """Test that category and inclusive price bounds combine, in catalog order"""
+        catalog = ColumnarCatalog(PRODUCTS)
+        assert ids(catalog, catalog.filter("jackets")) == [3, 5]
+        assert ids(catalog, catalog.filter(min_price=899, max_price=1299)) == [1, 2, 5]
+        assert ids(catalog, catalog.filter("bags", max_price=899)) == [2]
+        assert ids(catalog, catalog.filter("hats")) == []
+
+    def test_filter_keeps_relevance_order(self):
+        """Test that filtering search candidates keeps their ranking and drops unknown ids"""
+        catalog = ColumnarCatalog(PRODUCTS)
+        candidates = catalog.rows_for_ids([5, 99, 2, 3, 1])
+        assert ids(catalog, catalog.filter(rows=candidates)) == [5, 2, 3, 1]
+        assert ids(catalog, catalog.filter(max_price=1000, rows=candidates)) == [5, 2]
+
+    def test_partitions_follow_changes(self):
+        """Test that category listings reflect batched upserts and removals"""
+        catalog = ColumnarCatalog(PRODUCTS)
+        assert [p["id"] for p in catalog.partition("bags")] == [1, 2]
+
+        catalog.apply(upserts=[product(2, "shoes", 300), product(6, "bags", 99)], removed=[1])
+        assert [p["id"] for p in catalog.partition("bags")] == [6]
+        assert [p["id"] for p in catalog.partition("shoes")] == [2, 4]
+        assert [p["id"] for p in catalog.partition()] == [2, 3, 4, 5, 6]
+        assert ids(catalog, catalog.filter(max_price=300)) == [2, 6]
+        assert catalog.has_category("bags") and catalog.get(1) is None
+
+    def test_removed_category_is_empty(self):
+        """Test that a category whose last product is removed no longer matches"""
+        catalog = ColumnarCatalog(PRODUCTS)
+        catalog.remove(4)
+        assert not catalog.has_category("shoes")
+        assert catalog.partition("shoes") == []
@@ -0,0 +1,138 @@
+"""
+Versioned catalog cache tests, run offline against an in-memory MongoDB (mongomock-motor)
+"""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from catalog_cache import PATCH_MAX_CHANGES, CatalogCache, _release, bump_catalog_version, seed_catalog
+from search_index import ProductSearchIndex
+
+CATEGORIES = [{"id": "bags", "name": "حقائب", "nameEn": "Bags"}]
+
+
+def product(product_id: int, price=100) -> dict:
+    return {
+        "id": product_id,
+        "name": f"حقيبة {product_id}",
+        "nameEn": f"Bag {product_id}",
+        "category": "bags",
+        "price": price,
+        "image": f"https://example.com/{product_id}.jpg",
+        "isNew": False,
+    }
+
+
+PRODUCTS = [product(n) for n in range(1, 101)]
+
+
+async def loaded_cache(db) -> CatalogCache:
+    await seed_catalog(db, PRODUCTS, CATEGORIES)
+    cache = CatalogCache(PRODUCTS, CATEGORIES)
+    await cache.load(db)
+    return cache
+
+
+async def reprice(db, count: int) -> None:
+    for n in range(1, count + 1):
+        await db.products.update_one({"id": n}, {"$set": {"price": 999}})
+
+
+class TestCatalogCache:
+    """Small changes are patched in place, large ones rebuilt and swapped in"""
+
+    def test_small_change_patched_in_place(self):
+        """Test that up to PATCH_MAX_CHANGES changed products update the live structures"""
+        async def scenario():
+            db = AsyncMongoMockClient()["catalog"]
+            cache = await loaded_cache(db)
+            catalog = cache.catalog
+            await reprice(db, PATCH_MAX_CHANGES)
+            await bump_catalog_version(db)
+            assert await cache.refresh(db)
+            return cache, catalog
+
+        cache, catalog = asyncio.run(scenario())
+        assert cache.catalog is catalog
+        assert cache.catalog.get(PATCH_MAX_CHANGES)["price"] == 999
+        assert cache.catalog.get(PATCH_MAX_CHANGES + 1)["price"] == 100
+
+    def test_large_change_rebuilt_and_swapped(self):
+        """Test that more than PATCH_MAX_CHANGES changes build new structures"""
+        async def scenario():
+            db = AsyncMongoMockClient()["catalog"]
+            cache = await loaded_cache(db)
+            catalog, search_index = cache.catalog, cache.search_index
+            names, deletes = catalog.names, search_index._fuzzy._deletes
+            await reprice(db, PATCH_MAX_CHANGES + 1)
+            await db.products.delete_one({"id": 100})
+            await bump_catalog_version(db)
+            assert await cache.refresh(db)
+            return cache, catalog, search_index, names, deletes
+
+        cache, catalog, search_index, names, deletes = asyncio.run(scenario())
+        assert cache.catalog is not catalog and cache.search_index is not search_index
+        assert cache.catalog.get(PATCH_MAX_CHANGES + 1)["price"] == 999
+        assert cache.catalog.get(100) is None and cache.search_index.search("100") == []
+        # The replaced structures were emptied by _release
+        assert not names and not deletes
+
+    def test_version_stamp_gates_refresh(self):
+        """Test that refresh only reloads once the version stamp moves"""
+        async def scenario():
+            db = AsyncMongoMockClient()["catalog"]
+            cache = await loaded_cache(db)
+            assert cache.version == 1
+            assert not await cache.refresh(db)
+
+            # Unbumped edits stay invisible until the next bump
+            await reprice(db, 1)
+            assert not await cache.refresh(db)
+            assert cache.catalog.get(1)["price"] == 100
+
+            assert await bump_catalog_version(db) == 2
+            assert await cache.refresh(db)
+            assert cache.version == 2 and cache.catalog.get(1)["price"] == 999
+
+        asyncio.run(scenario())
+
+    def test_missing_version_stamp(self):
+        """Test that a catalog without catalog_meta loads, and reloads once a bump creates it"""
+        async def scenario():
+            db = AsyncMongoMockClient()["catalog"]
+            await db.products.insert_many([dict(p) for p in PRODUCTS[:3]])
+            await db.categories.insert_many([dict(c) for c in CATEGORIES])
+            cache = CatalogCache(PRODUCTS, CATEGORIES)
+            await cache.load(db)
+            assert cache.version is None and len(cache.catalog) == 3
+            assert not await cache.refresh(db)
+
+            await db.products.delete_one({"id": 3})
+            assert await bump_catalog_version(db) == 1
+            assert await cache.refresh(db)
+            assert cache.version == 1 and len(cache.catalog) == 2
+
+        asyncio.run(scenario())
+
+    def test_payloads_dropped_on_change(self):
+        """Test that serialized payloads are rebuilt after a change but kept otherwise"""
+        async def scenario():
+            db = AsyncMongoMockClient()["catalog"]
+            cache = await loaded_cache(db)
+            first = cache.payload(("product", 1), lambda: cache.catalog.get(1))
+            assert cache.payload(("product", 1), lambda: None) is first
+            await reprice(db, 1)
+            await bump_catalog_version(db)
+            await cache.refresh(db)
+            return first, cache.payload(("product", 1), lambda: cache.catalog.get(1))
+
+        first, second = asyncio.run(scenario())
+        assert first is not second
+
+    def test_release_drains_typo_index(self):
+        """Test that releasing a search index empties its deletion dictionary too"""
+        index = ProductSearchIndex(PRODUCTS)
+        deletes = index._fuzzy._deletes
+        assert deletes
+        _release([index])
+        assert not deletes
@@ -0,0 +1,116 @@
+"""
+Compression middleware tests, run offline against a throwaway app
+"""
+import gzip
+import json
+
+import brotli
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from compression import CompressionMiddleware, negotiate
+from http_cache import CachedPayload, cached_json_response
+
+ROWS = [{"id": i, "name": f"حقيبة جلدية فاخرة {i}", "nameEn": f"Luxury Leather Bag {i}"} for i in range(200)]
+
+
+def build_client() -> TestClient:
+    app = FastAPI()
+    payload = CachedPayload({"products": ROWS})
+
+    @app.get("/large")
+    async def large():
+        return {"products": ROWS}
+
+    @app.get("/tagged")
+    async def tagged():
+        return JSONResponse({"products": ROWS}, headers={"ETag": '"rows-v1"'})
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for row in ROWS:
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/cached")
+    async def cached(request: Request):
+        return cached_json_response(request, payload, "public, max-age=60")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def raw_get(client: TestClient, path: str, encoding: str):
+    # Fetch without httpx's transparent decoding so the wire bytes can be checked
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+class TestCompression:
+    """Responses are compressed according to Accept-Encoding"""
+
+    def test_negotiate(self):
+        """Test Accept-Encoding negotiation including q-values and wildcards"""
+        assert negotiate("gzip, br", ("br", "gzip")) == "br"
+        assert negotiate("gzip;q=1.0, br;q=0.5", ("br", "gzip")) == "gzip"
+        assert negotiate("br;q=0, *", ("br", "gzip")) == "gzip"
+        assert negotiate("identity", ("br", "gzip")) is None
+        assert negotiate(None, ("br", "gzip")) is None
+
+    def test_large_response_gzipped(self):
+        """Test that a response above the threshold is gzipped"""
+        response, raw = raw_get(build_client(), "/large", "gzip")
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) == len(raw)
+        assert json.loads(gzip.decompress(raw))["products"] == ROWS
+        print(f"Compressed /large to {len(raw)} bytes")
+
+    def test_small_response_untouched(self):
+        """Test that a response below the threshold is sent as-is"""
+        response, raw = raw_get(build_client(), "/small", "gzip, br")
+        assert "content-encoding" not in response.headers
+        assert json.loads(raw) == {"ok": True}
+
+    def test_streaming_response_brotli(self):
+        """Test that streamed NDJSON is compressed chunk by chunk"""
+        response, raw = raw_get(build_client(), "/stream", "br")
+        assert response.headers["content-encoding"] == "br"
+        assert "content-length" not in response.headers
+        lines = brotli.decompress(raw).decode().splitlines()
+        assert [json.loads(line) for line in lines] == ROWS
+
+    def test_precompressed_payload(self):
+        """Test that cached payloads are served from their precompressed variants"""
+        client = build_client()
+        response, raw = raw_get(client, "/cached", "br")
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["etag"].endswith('-br"')
+        assert json.loads(brotli.decompress(raw))["products"] == ROWS
+
+        response = client.get("/cached", headers={"Accept-Encoding": "br", "If-None-Match": response.headers["etag"]})
+        assert response.status_code == 304
+        print(f"Precompressed variants: {sorted(CachedPayload({'products': ROWS}).variants)}")
+
+    def test_compressed_response_etag_weakened(self):
+        """Test that a strong ETag computed over the identity body is weakened once compressed"""
+        client = build_client()
+        response, _ = raw_get(client, "/tagged", "gzip")
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"] == 'W/"rows-v1"'
+        response, _ = raw_get(client, "/tagged", "identity")
+        assert response.headers["etag"] == '"rows-v1"'
+
+    def test_precompress_follows_configured_threshold(self):
+        """Test that payloads are precompressed from the middleware's minimum size, not the default"""
+        content = {"products": ROWS[:5]}
+        size = len(CachedPayload(content).body)
+        assert 256 < size < 1024
+        assert CachedPayload(content).variants == {}
+        assert "gzip" in CachedPayload(content, minimum_size=256).variants
@@ -0,0 +1,88 @@
+"""
+Incremental catalog updates checked against fresh rebuilds, with seeded random changes
+"""
+import random
+
+import autocomplete
+from autocomplete import SuggestionIndex
+from catalog import ColumnarCatalog
+from search_index import ProductSearchIndex
+
+SEED = 20240517
+ROUNDS = 40
+
+ARABIC_WORDS = ["حقيبة", "الحقيبة", "جلدية", "فاخرة", "ألوان", "آلة", "كلاسيكية", "هاتف", "سوداء", "الجلد"]
+ENGLISH_WORDS = ["leather", "bag", "bags", "handbag", "classic", "luxury", "black", "jacket", "wool", "coat"]
+CATEGORIES = ["bags", "jackets", "shoes", "accessories"]
+QUERIES = ["bag", "lea", "lether", "classic bag", "حقيبة", "الح", "ألوان", "جلد", "coat wool", "zzz"]
+
+
+def random_product(rng: random.Random, product_id: int) -> dict:
+    return {
+        "id": product_id,
+        "name": " ".join(rng.sample(ARABIC_WORDS, rng.randint(1, 3))),
+        "nameEn": " ".join(rng.sample(ENGLISH_WORDS, rng.randint(1, 3))).title(),
+        "category": rng.choice(CATEGORIES),
+        "price": rng.choice([99, 450, 899, 899.5, 1299, 1599]),
+        "image": f"https://example.com/{product_id}.jpg",
+        "isNew": rng.random() < 0.3,
+    }
+
+
+def random_changes(rng: random.Random, products: dict):
+    upserts = [random_product(rng, rng.randint(1, 120)) for _ in range(rng.randint(0, 25))]
+    removed = rng.sample(sorted(products), min(len(products), rng.randint(0, 10)))
+    return upserts, removed
+
+
+def catalog_view(catalog: ColumnarCatalog) -> dict:
+    return {
+        "all": catalog.partition(),
+        "categories": {c: catalog.partition(c) for c in CATEGORIES if catalog.has_category(c)},
+        "filtered": [
+            [int(catalog.ids[row]) for row in catalog.filter(category, low, high)]
+            for category in [None] + CATEGORIES
+            for low, high in [(None, None), (450, 899.5), (900, None)]
+        ],
+    }
+
+
+class TestIncrementalUpdates:
+    """Applying changes gives the same answers as rebuilding from scratch"""
+
+    def test_random_changes_match_rebuild(self, monkeypatch):
+        """Test that random upserts and removals leave catalog and indexes equal to a rebuild"""
+        # Small enough that cached completions are kept and invalidated along the way
+        monkeypatch.setattr(autocomplete, "CACHED_RANGE_SIZE", 4)
+        rng = random.Random(SEED)
+        # Insertion order is the rebuild order: updates keep their place, re-added products go last
+        products = {}
+        for product_id in range(1, 61):
+            products[product_id] = random_product(rng, product_id)
+
+        catalog = ColumnarCatalog(products.values())
+        search = ProductSearchIndex(products.values())
+        suggestions = SuggestionIndex(products.values())
+
+        for _ in range(ROUNDS):
+            upserts, removed = random_changes(rng, products)
+            for product_id in removed:
+                products.pop(product_id)
+                search.remove(product_id)
+                suggestions.remove(product_id)
+            for product in upserts:
+                products[product["id"]] = product
+                search.upsert(product)
+                suggestions.upsert(product)
+            # Catalog takes the same changes as one batch: removals first, then upserts
+            catalog.apply(upserts, removed)
+
+            assert catalog_view(catalog) == catalog_view(ColumnarCatalog(products.values()))
+            rebuilt_search = ProductSearchIndex(products.values())
+            rebuilt_suggestions = SuggestionIndex(products.values())
+            for query in QUERIES:
+                assert search.search(query) == rebuilt_search.search(query), query
+                for prefix in (query, query[:1], query[:2]):
+                    assert suggestions.suggest(prefix) == rebuilt_suggestions.suggest(prefix), prefix
+
+        print(f"{ROUNDS} rounds of random changes matched a rebuild, {len(products)} products left")
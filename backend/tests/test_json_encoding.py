@@ -0,0 +1,67 @@
+"""
+FastJSONResponse / FastJSONRoute tests, run offline against a throwaway app
+"""
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from json_encoding import FastJSONResponse, FastJSONRoute
+
+STAMP = datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+ORDER_ID = uuid.UUID("6f1c2a4e-8d3b-4c5a-9e7f-0a1b2c3d4e5f")
+
+
+class Stamped(BaseModel):
+    id: uuid.UUID
+    created_at: datetime
+
+
+def build_client() -> TestClient:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    router = APIRouter(prefix="/api", route_class=FastJSONRoute)
+
+    @router.get("/plain")
+    async def plain():
+        return {"id": ORDER_ID, "created_at": STAMP, "name": "حقيبة", "counts": {1: 2}}
+
+    @router.post("/created", status_code=201)
+    async def created():
+        return {"ok": True}
+
+    @router.get("/model", response_model=Stamped)
+    async def model():
+        return {"id": ORDER_ID, "created_at": STAMP, "extra": "dropped"}
+
+    app.include_router(router)
+    return TestClient(app)
+
+
+class TestJSONEncoding:
+    """Responses are rendered by orjson with FastAPI-compatible output"""
+
+    def test_datetime_and_uuid(self):
+        """Test that datetimes render like isoformat() and UUIDs as strings"""
+        response = build_client().get("/api/plain")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        data = response.json()
+        assert data["id"] == str(ORDER_ID)
+        assert data["created_at"] == STAMP.isoformat()
+        assert data["name"] == "حقيبة"
+        assert data["counts"] == {"1": 2}
+        print(f"Encoded: {response.content!r}")
+
+    def test_route_status_code_kept(self):
+        """Test that a decorator status_code survives the fast path"""
+        response = build_client().post("/api/created")
+        assert response.status_code == 201
+        assert response.json() == {"ok": True}
+
+    def test_response_model_still_filters(self):
+        """Test that routes with a response_model are still validated and filtered"""
+        data = build_client().get("/api/model").json()
+        assert data == {"id": str(ORDER_ID), "created_at": "2025-03-01T12:30:15.123456Z"}
+        print(f"Model response: {data}")
@@ -0,0 +1,60 @@
+"""
+Metrics tests, run offline against a throwaway app and synthetic command events
+"""
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from metrics import Histogram, MetricsMiddleware, MongoCommandMetrics, Registry
+
+
+class TestMetrics:
+    """Histograms render in the Prometheus text format"""
+
+    def test_histogram_exposition(self):
+        """Test that buckets are cumulative and count/sum match the observations"""
+        registry = Registry()
+        histogram = registry.histogram("demo_seconds", "Demo", ["op"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, "read")
+
+        lines = registry.render().splitlines()
+        assert 'demo_seconds_bucket{op="read",le="0.1"} 1' in lines
+        assert 'demo_seconds_bucket{op="read",le="1.0"} 3' in lines
+        assert 'demo_seconds_bucket{op="read",le="+Inf"} 4' in lines
+        assert 'demo_seconds_count{op="read"} 4' in lines
+        assert 'demo_seconds_sum{op="read"} 6.05' in lines
+
+    def test_middleware_labels_by_route_template(self):
+        """Test that requests are labelled by route template, not the raw path"""
+        histogram = Histogram("http_request_duration_seconds", "Latency", ["method", "route", "status"])
+        app = FastAPI()
+
+        @app.get("/api/products/{product_id}")
+        async def product(product_id: int):
+            return {"id": product_id}
+
+        app.add_middleware(MetricsMiddleware, histogram=histogram)
+        client = TestClient(app)
+        client.get("/api/products/1")
+        client.get("/api/products/2")
+        client.get("/api/does-not-exist")
+
+        text = "\n".join(histogram.collect())
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/products/{product_id}",status="200"} 2' in text
+        assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in text
+
+    def test_mongo_command_listener(self):
+        """Test that command events are timed by collection and command name"""
+        histogram = Histogram("mongodb_command_duration_seconds", "Latency", ["collection", "command", "outcome"])
+        listener = MongoCommandMetrics(histogram)
+        started = SimpleNamespace(
+            command={"find": "orders", "filter": {}}, command_name="find", connection_id=("db", 27017), request_id=7,
+        )
+        listener.started(started)
+        listener.succeeded(SimpleNamespace(connection_id=("db", 27017), request_id=7, duration_micros=2500))
+
+        text = "\n".join(histogram.collect())
+        assert 'mongodb_command_duration_seconds_count{collection="orders",command="find",outcome="ok"} 1' in text
+        assert 'mongodb_command_duration_seconds_sum{collection="orders",command="find",outcome="ok"} 0.0025' in text
@@ -0,0 +1,78 @@
+"""
+Order history tests, run offline by recording the pipeline sent to MongoDB
+"""
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import Request
+
+USER = {"id": "user-1"}
+
+
+class RecordingCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.docs:
+            raise StopAsyncIteration
+        return self.docs.pop(0)
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return RecordingCursor([])
+
+
+def get_orders(server, response_format=None, **params) -> list:
+    orders = RecordingCollection()
+    request = Request({"type": "http", "method": "GET", "path": "/api/orders", "headers": []})
+    kwargs = {"limit": None, "cursor": None, **params}
+    asyncio.run(server.get_orders(
+        request, response_format=response_format, user=USER, db=SimpleNamespace(orders=orders), **kwargs
+    ))
+    [pipeline] = orders.pipelines
+    return pipeline
+
+
+def stage(pipeline, name):
+    return [s[name] for s in pipeline if name in s]
+
+
+class TestOrderPages:
+    """JSON and NDJSON order listings honor the same limit and cursor"""
+
+    def test_json_page_defaults_to_page_size(self, server):
+        """Test that a JSON listing without limit fetches one page plus one to detect more"""
+        pipeline = get_orders(server)
+        assert stage(pipeline, "$limit") == [server.ORDER_PAGE_SIZE + 1]
+
+    def test_ndjson_honors_limit(self, server):
+        """Test that an NDJSON listing with limit streams at most that many orders"""
+        pipeline = get_orders(server, "ndjson", limit=5)
+        assert stage(pipeline, "$limit") == [5]
+
+    def test_ndjson_without_limit_streams_rest(self, server):
+        """Test that an NDJSON listing without limit streams the whole history"""
+        assert stage(get_orders(server, "ndjson"), "$limit") == []
+
+    def test_ndjson_honors_cursor(self, server):
+        """Test that an NDJSON listing starts after the cursor, like the JSON pages"""
+        cursor = server._encode_order_cursor({"created_at": "2024-05-01T10:00:00+00:00", "id": "order-9"})
+        json_match = stage(get_orders(server, cursor=cursor), "$match")
+        ndjson_match = stage(get_orders(server, "ndjson", cursor=cursor), "$match")
+        assert ndjson_match == json_match
+        assert ndjson_match[0]["$or"][1] == {"created_at": "2024-05-01T10:00:00+00:00", "id": {"$lt": "order-9"}}
@@ -0,0 +1,63 @@
+"""
+Profiler tests, run offline against a busy thread and a throwaway app
+"""
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import ProfilingMiddleware, StackSampler, collapsed, token_matches
+
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestProfiling:
+    """Live-worker profiling returns collapsed stacks and per-request profiles"""
+
+    def test_sampler_sees_busy_thread(self):
+        """Test that the stack sampler attributes samples to a busy function"""
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+        worker.start()
+        try:
+            counts = StackSampler().sample(seconds=0.3, interval=0.005)
+        finally:
+            stop.set()
+            worker.join()
+
+        busy = [stack for stack in counts if stack.startswith("busy;") and "busy_loop" in stack]
+        assert busy, f"No samples in busy_loop: {list(counts)[:5]}"
+        for line in collapsed(counts).splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0 and ";" in stack
+        print(f"Sampled {sum(counts.values())} stacks, {len(counts)} distinct")
+
+    def test_token_required(self):
+        """Test that profiling stays disabled without a configured token"""
+        assert not token_matches("anything", None)
+        assert not token_matches(None, "secret")
+        assert not token_matches("wrong", "secret")
+        assert token_matches("secret", "secret")
+
+    def test_request_profile(self):
+        """Test that a request with the profiler token gets pstats output instead of its body"""
+        app = FastAPI()
+
+        @app.get("/slow")
+        async def slow():
+            time.sleep(0.01)
+            return {"ok": True}
+
+        app.add_middleware(ProfilingMiddleware, token="secret")
+        client = TestClient(app)
+
+        assert client.get("/slow").json() == {"ok": True}
+        response = client.get("/slow", headers={"X-Profile-Request": "secret"})
+        assert response.status_code == 200
+        assert response.headers["x-profiled-status"] == "200"
+        assert "cumulative" in response.text
+        print(response.text.splitlines()[0])
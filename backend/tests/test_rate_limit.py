@@ -0,0 +1,56 @@
+"""
+Auth rate limiter tests, run offline against the in-process bucket store
+"""
+import asyncio
+from types import SimpleNamespace
+
+from rate_limit import BucketRule, MemoryBucketStore, RateLimiter, client_ip
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestRateLimit:
+    """Token buckets reject bursts and refill over time"""
+
+    def test_burst_then_reject(self):
+        """Test that a bucket allows its capacity and then reports a retry-after"""
+        limiter = RateLimiter(MemoryBucketStore(maxsize=100))
+        rule = BucketRule(capacity=3, per_seconds=60)
+
+        results = [run(limiter.check(("login_email", rule, "a@7777.com"))) for _ in range(4)]
+        assert results[:3] == [None, None, None]
+        assert 0 < results[3] <= 20, f"Expected about 20s until the next token, got {results[3]}"
+        # Other keys have their own bucket
+        assert run(limiter.check(("login_email", rule, "b@7777.com"))) is None
+        print(f"Fourth attempt rejected, retry after {results[3]:.1f}s")
+
+    def test_stops_at_first_empty_bucket(self):
+        """Test that a rejected request doesn't drain the buckets after the one that rejected it"""
+        store = MemoryBucketStore(maxsize=100)
+        limiter = RateLimiter(store)
+        ip_rule = BucketRule(capacity=1, per_seconds=60)
+        email_rule = BucketRule(capacity=2, per_seconds=60)
+
+        assert run(limiter.check(("login_ip", ip_rule, "1.2.3.4"), ("login_email", email_rule, "a@7777.com"))) is None
+        assert run(limiter.check(("login_ip", ip_rule, "1.2.3.4"), ("login_email", email_rule, "a@7777.com"))) > 0
+        # The email bucket still has its second token
+        assert run(limiter.check(("login_email", email_rule, "a@7777.com"))) is None
+
+    def test_store_is_bounded(self):
+        """Test that the in-process store evicts least recently used buckets"""
+        store = MemoryBucketStore(maxsize=10)
+        rule = BucketRule(capacity=1, per_seconds=60)
+        for i in range(50):
+            run(store.take(f"login_ip:10.0.0.{i}", rule))
+        assert len(store) == 10
+
+    def test_client_ip_trusts_only_proxy_hops(self):
+        """Test that only the X-Forwarded-For entries added by our proxies are used"""
+        request = SimpleNamespace(
+            headers={"x-forwarded-for": "6.6.6.6, 203.0.113.7"},
+            client=SimpleNamespace(host="10.0.0.1"),
+        )
+        assert client_ip(request, trusted_proxy_hops=1) == "203.0.113.7"
+        assert client_ip(request, trusted_proxy_hops=0) == "10.0.0.1"
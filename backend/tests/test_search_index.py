@@ -0,0 +1,137 @@
+"""
+Product search and autocomplete index tests, run offline on in-memory products
+"""
+from autocomplete import SuggestionIndex
+from search_index import DeletionDictionary, ProductSearchIndex, normalize_token, tokenize
+
+PRODUCTS = [
+    {"id": 1, "name": "حقيبة يد كلاسيكية", "nameEn": "Classic Handbag"},
+    {"id": 2, "name": "حقيبة جلدية", "nameEn": "Leather Bag"},
+    {"id": 3, "name": "حقائب سفر", "nameEn": "Leather Bags"},
+    {"id": 4, "name": "جاكيت جلد", "nameEn": "Leather Jacket"},
+]
+
+ARABIC_PRODUCTS = [
+    {"id": 1, "name": "هدية فاخرة", "nameEn": "Luxury Gift"},
+    {"id": 2, "name": "حقيبة هاتف", "nameEn": "Phone Pouch"},
+    {"id": 3, "name": "وان بيس أسود", "nameEn": "Black One Piece"},
+    {"id": 4, "name": "الحقيبة الجلدية", "nameEn": "Leather Satchel"},
+    {"id": 5, "name": "ألوان زاهية", "nameEn": "Bright Colours"},
+    {"id": 6, "name": "آلة قهوة", "nameEn": "Coffee Machine"},
+]
+
+
+def suggested_ids(index: SuggestionIndex, prefix: str) -> set:
+    return {s["product_id"] for s in index.suggest(prefix)}
+
+
+class TestNormalization:
+    """Tokens fold to one form whatever the spelling variant"""
+
+    def test_latin_case_and_accents(self):
+        """Test that case, accents and punctuation don't split or change tokens"""
+        assert tokenize("Café  Crème-Brûlée") == ["cafe", "creme", "brulee"]
+
+    def test_arabic_variants(self):
+        """Test that harakat, tatweel, letter variants and Arabic-Indic digits are folded"""
+        assert tokenize("حَقِيبَة") == tokenize("حقيـــبة") == ["حقيبه"]
+        assert tokenize("مستشفى") == ["مستشفي"]
+        assert tokenize("إطار ٢٠٢٤") == ["اطار", "2024"]
+
+
+class TestProductSearchIndex:
+    """Queries match whole tokens or token prefixes, then typos"""
+
+    def test_token_prefix_not_substring(self):
+        """Test that a query matches the start of a word only, so 'bag' doesn't find 'Handbag'"""
+        # Search used to scan names for substrings; words now match from their start
+        index = ProductSearchIndex(PRODUCTS)
+        assert index.search("bag") == [2, 3]
+        assert index.search("hand") == [1]
+
+    def test_exact_token_ranks_above_prefix(self):
+        """Test that a whole-word hit ranks above a longer word it prefixes"""
+        index = ProductSearchIndex(PRODUCTS)
+        assert index.search("bag") == [2, 3]
+        assert index.search("bags") == [3]
+
+    def test_every_query_token_must_match(self):
+        """Test that multi-word queries intersect their matches"""
+        index = ProductSearchIndex(PRODUCTS)
+        assert index.search("leather bag") == [2, 3]
+        assert index.search("classic leather") == []
+
+    def test_fuzzy_only_without_prefix_matches(self):
+        """Test that typos fall back to the deletion dictionary, and short tokens don't"""
+        index = ProductSearchIndex(PRODUCTS)
+        assert index.search("jakcet") == [4]
+        assert index.search("lather jacket") == [4]
+        assert index.search("bga") == []
+
+    def test_upsert_and_remove(self):
+        """Test that renamed and removed products leave no stale postings"""
+        index = ProductSearchIndex(PRODUCTS)
+        index.upsert({"id": 4, "name": "معطف", "nameEn": "Wool Coat"})
+        index.remove(2)
+        assert index.search("jacket") == []
+        assert index.search("coat") == [4]
+        assert index.search("leather") == [3]
+        assert len(index) == 3
+
+
+class TestDeletionDictionary:
+    """Terms are found within the allowed edit distance"""
+
+    def test_lookup_respects_distance(self):
+        """Test that lookups return terms within the distance, closest first"""
+        fuzzy = DeletionDictionary()
+        fuzzy.add("leather")
+        fuzzy.add("feather")
+        assert fuzzy.lookup("lether", 2) == [("leather", 1), ("feather", 2)]
+        assert fuzzy.lookup("lether", 1) == [("leather", 1)]
+        assert fuzzy.lookup("lether", 0) == []
+
+    def test_discard_drops_empty_variants(self):
+        """Test that discarding the last term under a variant frees the variant"""
+        fuzzy = DeletionDictionary()
+        fuzzy.add("leather")
+        fuzzy.discard("leather")
+        assert fuzzy.lookup("lether", 2) == []
+        assert not fuzzy._deletes
+
+
+class TestArabicArticle:
+    """The definite article is dropped from whole words only"""
+
+    def test_article_stripped_from_complete_words(self):
+        """Test that "ال" is dropped when a stem of three or more letters follows"""
+        assert tokenize("الحقيبة") == tokenize("حقيبة") == ["حقيبه"]
+        assert normalize_token("الجلدية") == "جلديه"
+        # Too short to be article + stem
+        assert normalize_token("الح") == "الح"
+
+    def test_hamza_alef_is_not_an_article(self):
+        """Test that words starting with أل or آل keep their first letters"""
+        assert tokenize("ألوان") == ["الوان"]
+        assert tokenize("آلة") == ["اله"]
+
+    def test_hamza_alef_words_match_only_themselves(self):
+        """Test that "آلة" and "ألوان" don't match products sharing a shorter stem"""
+        search = ProductSearchIndex(ARABIC_PRODUCTS)
+        suggestions = SuggestionIndex(ARABIC_PRODUCTS)
+
+        assert search.search("آلة") == [6]
+        assert search.search("ألوان") == [5]
+        assert suggested_ids(suggestions, "آلة") == {6}
+        assert suggested_ids(suggestions, "ألوان") == {5}
+
+    def test_partial_word_after_article(self):
+        """Test that "الح" matches words with and without the article while being typed"""
+        search = ProductSearchIndex(ARABIC_PRODUCTS)
+        suggestions = SuggestionIndex(ARABIC_PRODUCTS)
+
+        assert set(search.search("الح")) == {2, 4}
+        assert suggested_ids(suggestions, "الح") == {2, 4}
+        # Only the last word counts as unfinished
+        assert search.search("الح هاتف") == []
+        print(f"'الح' suggestions: {suggestions.suggest('الح')}")
@@ -0,0 +1,124 @@
+"""
+Pooled Stripe client tests, run offline against tests/stripe_stub.py and, for
+the checkout routes, against the benchmark stand-ins (mongomock, stub StripeCheckout)
+"""
+import pytest
+import stripe
+
+from stripe_client import StripeCheckoutPool, configure_stripe_http
+from stripe_stub import StripeStubServer
+
+CHECKOUT_ITEM = {"product_id": 1, "name": "Luxury Leather Bag", "price": 1299, "quantity": 1, "size": "M"}
+
+
+@pytest.fixture(scope="module")
+def stripe_stub():
+    server = StripeStubServer().start()
+    previous = (stripe.api_base, stripe.api_key, stripe.default_http_client, stripe.max_network_retries)
+    session = configure_stripe_http(timeout=5, pool_size=4, max_network_retries=0, api_base=server.url)
+    stripe.api_key = "sk_test_stub"
+    yield server
+    session.close()
+    stripe.api_base, stripe.api_key, stripe.default_http_client, stripe.max_network_retries = previous
+    server.shutdown()
+
+
+@pytest.fixture
+def built_clients(server, monkeypatch):
+    """StripeCheckout instances built while the test runs, through the stand-in class."""
+    import emergentintegrations.payments.stripe.checkout as checkout
+
+    built = []
+
+    class RecordingStripeCheckout(checkout.StripeCheckout):
+        def __init__(self, api_key, webhook_url):
+            super().__init__(api_key, webhook_url)
+            built.append(self)
+
+    monkeypatch.setattr(checkout, "StripeCheckout", RecordingStripeCheckout)
+    return built
+
+
+def create_session(amount: int = 1000, quantity: int = 2):
+    return stripe.checkout.Session.create(
+        mode="payment",
+        success_url="http://localhost/checkout/success",
+        cancel_url="http://localhost/checkout/cancel",
+        line_items=[{
+            "price_data": {"currency": "sar", "unit_amount": amount, "product_data": {"name": "TEST item"}},
+            "quantity": quantity,
+        }],
+        metadata={"source": "7777_store"},
+    )
+
+
+class TestStripePool:
+    """Stripe calls share one keep-alive connection pool"""
+
+    def test_sequential_calls_reuse_one_connection(self, stripe_stub):
+        """Test that several Stripe calls go over a single pooled connection"""
+        before = stripe_stub.connections
+        sessions = [create_session() for _ in range(3)]
+        stripe.checkout.Session.retrieve(sessions[0].id)
+
+        assert stripe_stub.connections - before <= 1, \
+            f"Expected connection reuse, stub saw {stripe_stub.connections - before} connections"
+        print(f"4 Stripe calls used {stripe_stub.connections - before} connection(s)")
+
+    def test_session_roundtrip(self, stripe_stub):
+        """Test that a created session can be retrieved and completed"""
+        session = create_session(amount=1500, quantity=2)
+        assert session.url
+        assert session.amount_total == 3000
+        assert session.metadata["source"] == "7777_store"
+
+        retrieved = stripe.checkout.Session.retrieve(session.id)
+        assert retrieved.status == "open"
+        assert retrieved.payment_status == "unpaid"
+        print(f"Stub session roundtrip OK: {session.id}")
+
+
+class TestStripeCheckoutPool:
+    """One StripeCheckout is reused across requests, whatever Host they carry"""
+
+    def test_public_base_url_keys_the_pool(self, built_clients):
+        """Test that a configured public URL gives one client and the webhook URL ignores Host"""
+        pool = StripeCheckoutPool("sk_test_stub", "/api/webhook/stripe", public_base_url="https://shop.example/")
+        clients = {id(pool.get(f"http://spoofed-{i}.example/")) for i in range(20)}
+
+        assert len(clients) == 1 and len(built_clients) == 1
+        assert built_clients[0].webhook_url == "https://shop.example/api/webhook/stripe"
+
+    def test_made_up_hosts_do_not_disable_pooling(self, built_clients):
+        """Test that many Host values only evict each other, and a busy host stays pooled"""
+        pool = StripeCheckoutPool("sk_test_stub", "/api/webhook/stripe", maxsize=4)
+        real = pool.get("http://shop.example/")
+        for i in range(20):
+            pool.get(f"http://spoofed-{i}.example/")
+            assert pool.get("http://shop.example/") is real
+
+        built = len(built_clients)
+        assert pool.get("http://shop.example/") is real
+        assert len(built_clients) == built, "A pooled client was rebuilt"
+        print(f"21 hosts built {built} clients, the real host's client was kept")
+
+    def test_checkout_route_reuses_pooled_client(self, server, built_clients, monkeypatch):
+        """Test that create-session and status requests share one client across Host headers"""
+        from fastapi.testclient import TestClient
+
+        monkeypatch.setattr(server, "stripe_checkout_pool", StripeCheckoutPool(
+            "sk_test_stub", "/api/webhook/stripe", public_base_url="https://shop.example",
+        ))
+        client = TestClient(server.app)
+        for i in range(3):
+            response = client.post(
+                "/api/checkout/create-session",
+                headers={"host": f"spoofed-{i}.example"},
+                json={"origin_url": "http://localhost:3000", "items": [CHECKOUT_ITEM]},
+            )
+            assert response.status_code == 200, response.text
+        status = client.get(f"/api/checkout/status/{response.json()['session_id']}")
+        assert status.status_code == 200, status.text
+
+        assert len(built_clients) == 1
+        assert built_clients[0].webhook_url == "https://shop.example/api/webhook/stripe"
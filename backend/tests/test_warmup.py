@@ -0,0 +1,111 @@
+"""
+Startup warm-up and readiness tests, run offline with in-memory steps
+"""
+import asyncio
+
+from warmup import WarmUp
+
+
+class TestWarmUp:
+    """Readiness follows the warm-up steps"""
+
+    def test_ready_once_all_steps_succeed(self):
+        """Test that a worker whose steps all succeed is ready once the warm-up finishes"""
+        calls = []
+
+        async def step():
+            calls.append(1)
+
+        async def scenario():
+            warm_up = WarmUp({"mongo": step, "bcrypt": step})
+            assert not warm_up.ready
+            warm_up.start()
+            await warm_up.wait()
+            return warm_up
+
+        warm_up = asyncio.run(scenario())
+        report = warm_up.report()
+        assert report["ready"] and len(calls) == 2
+        assert all(s["ok"] for s in report["steps"].values())
+        print(f"Ready after warm-up: {report}")
+
+    def test_failed_step_is_retried(self):
+        """Test that a failing step keeps the worker unready until a retry succeeds"""
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("mongo unreachable")
+
+        async def fine():
+            pass
+
+        async def scenario():
+            warm_up = WarmUp({"mongo": flaky, "catalog": fine}, retry_interval=0.01)
+            warm_up.start()
+            while warm_up.status["mongo"] == "pending":
+                await asyncio.sleep(0)
+            report = warm_up.report()
+            assert not report["ready"]
+            assert report["steps"]["mongo"]["error"] == "mongo unreachable"
+            assert report["steps"]["catalog"]["ok"]
+            for _ in range(100):
+                if warm_up.ready:
+                    break
+                await asyncio.sleep(0.01)
+            await warm_up.stop()
+            return warm_up
+
+        warm_up = asyncio.run(scenario())
+        # The successful step ran once; only the failing one was retried
+        assert len(attempts) == 3
+        assert warm_up.status == {"mongo": None, "catalog": None}
+
+    def test_not_ready_after_stop(self):
+        """Test that a stopping worker drops out of readiness so traffic drains"""
+        async def step():
+            pass
+
+        async def scenario():
+            warm_up = WarmUp({"mongo": step})
+            warm_up.start()
+            await warm_up.wait()
+            assert warm_up.ready
+            await warm_up.stop()
+            return warm_up
+
+        assert not asyncio.run(scenario()).ready
+
+    def test_start_does_not_wait_for_steps(self):
+        """Test that start returns while a step is still hanging, and stop cancels it"""
+        async def unreachable():
+            await asyncio.sleep(3600)
+
+        async def scenario():
+            warm_up = WarmUp({"mongo": unreachable})
+            warm_up.start()
+            await asyncio.sleep(0.01)
+            assert warm_up.report()["steps"]["mongo"]["error"] == "pending"
+            await warm_up.stop()
+            return warm_up
+
+        assert not asyncio.run(scenario()).ready
+
+    def test_restart_runs_every_step_again(self):
+        """Test that starting again after a stop re-runs the steps and becomes ready again"""
+        calls = []
+
+        async def step():
+            calls.append(1)
+
+        async def scenario():
+            warm_up = WarmUp({"catalog": step})
+            for _ in range(2):
+                warm_up.start()
+                await warm_up.wait()
+                assert warm_up.ready
+                await warm_up.stop()
+
+        asyncio.run(scenario())
+        assert len(calls) == 2
@@ -0,0 +1,221 @@
+"""
+Stripe webhook queue tests, run offline against an in-memory MongoDB (mongomock-motor)
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import ASCENDING, IndexModel
+
+from db_indexes import WEBHOOK_EVENT_RETENTION_SECONDS, ensure_indexes
+from webhook_queue import WebhookEventQueue
+
+
+def completed_event(n: int) -> dict:
+    return {
+        "event_id": f"evt_test_{n}",
+        "event_type": "checkout.session.completed",
+        "session_id": f"cs_test_{n}",
+        "payment_status": "paid",
+    }
+
+
+class FlakyWebhookEventQueue(WebhookEventQueue):
+    """Fails the first `failures` batches, like a MongoDB primary stepping down."""
+
+    def __init__(self, *args, failures: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+        self.attempts = 0
+
+    async def _apply(self, batch):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("not primary")
+        await super()._apply(batch)
+
+
+class RecordingWebhookEventQueue(WebhookEventQueue):
+    """Remembers the event ids of every batch it applies."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.applied = []
+
+    async def _apply(self, batch):
+        self.applied += [event["event_id"] for event in batch]
+        await super()._apply(batch)
+
+
+async def seed_orders(db, count: int) -> None:
+    await db.orders.insert_many([
+        {"session_id": f"cs_test_{n}", "status": "pending", "payment_status": "unpaid"} for n in range(count)
+    ])
+
+
+async def wait_until_paid(db, count: int) -> bool:
+    for _ in range(200):
+        if await db.orders.count_documents({"payment_status": "paid"}) == count:
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+def make_queue(db, cls=WebhookEventQueue, **kwargs):
+    return cls(db, maxsize=100, batch_size=10, flush_interval=0.01, retry_initial=0.01, retry_max=0.05, **kwargs)
+
+
+class TestWebhookQueue:
+    """Events are applied once, and eventually even when a batch fails"""
+
+    def test_duplicate_of_applied_event_is_dropped(self):
+        """Test that Stripe retries of an applied event are acknowledged without requeueing"""
+        async def scenario():
+            db = AsyncMongoMockClient()["webhooks"]
+            await seed_orders(db, 1)
+            queue = make_queue(db)
+            queue.start()
+            try:
+                assert await queue.submit(completed_event(0)) is True
+                assert await wait_until_paid(db, 1)
+                stored = await db.webhook_events.find_one({"_id": "evt_test_0"})
+                assert stored["processed_at"] is not None
+                assert await queue.submit(completed_event(0)) is False
+            finally:
+                await queue.stop()
+
+        asyncio.run(scenario())
+
+    def test_failed_batch_is_retried(self):
+        """Test that a batch failing on MongoDB errors is retried until the orders are paid"""
+        async def scenario():
+            db = AsyncMongoMockClient()["webhooks"]
+            await seed_orders(db, 3)
+            queue = make_queue(db, FlakyWebhookEventQueue, failures=2)
+            queue.start()
+            try:
+                for n in range(3):
+                    assert await queue.submit(completed_event(n)) is True
+                assert await wait_until_paid(db, 3), "Orders still pending after the batch failed"
+                assert await db.webhook_events.count_documents({"processed_at": None}) == 0
+                return queue.attempts
+            finally:
+                await queue.stop()
+
+        attempts = asyncio.run(scenario())
+        assert attempts >= 3
+        print(f"Batch applied after {attempts} attempts")
+
+    def test_unapplied_duplicate_is_requeued(self):
+        """Test that a retry of a stored but unapplied event is queued again"""
+        async def scenario():
+            db = AsyncMongoMockClient()["webhooks"]
+            await seed_orders(db, 1)
+            # Stored by a worker that stopped before applying it
+            await db.webhook_events.insert_one({"_id": "evt_test_0", **completed_event(0), "processed_at": None})
+            queue = make_queue(db)
+            assert await queue.submit(completed_event(0)) is True
+            assert queue._queue.qsize() == 1
+
+        asyncio.run(scenario())
+
+    def test_unprocessed_events_replayed_on_start(self):
+        """Test that events left unprocessed by a previous worker are applied at start"""
+        async def scenario():
+            db = AsyncMongoMockClient()["webhooks"]
+            await seed_orders(db, 2)
+            await db.webhook_events.insert_many([
+                {"_id": f"evt_test_{n}", **completed_event(n), "processed_at": None} for n in range(2)
+            ])
+            queue = make_queue(db)
+            queue.start()
+            try:
+                assert await wait_until_paid(db, 2)
+            finally:
+                await queue.stop()
+
+        asyncio.run(scenario())
+
+
+class TestReplayClaims:
+    """Workers replaying at the same time apply each stored event once"""
+
+    def test_workers_split_backlog(self):
+        """Test that two workers starting together replay disjoint parts of the backlog"""
+        async def scenario():
+            db = AsyncMongoMockClient()["webhooks"]
+            await seed_orders(db, 25)
+            await db.webhook_events.insert_many([
+                {"_id": f"evt_test_{n}", **completed_event(n), "processed_at": None} for n in range(25)
+            ])
+            workers = [make_queue(db, RecordingWebhookEventQueue) for _ in range(2)]
+            for worker in workers:
+                worker.start()
+            try:
+                assert await wait_until_paid(db, 25)
+            finally:
+                for worker in workers:
+                    await worker.stop()
+            return [worker.applied for worker in workers]
+
+        first, second = asyncio.run(scenario())
+        assert sorted(first + second) == sorted(f"evt_test_{n}" for n in range(25))
+        print(f"Backlog split {len(first)}/{len(second)} between the workers")
+
+    def test_queued_event_not_replayed_by_another_worker(self):
+        """Test that an event waiting in one worker's queue is left to that worker"""
+        async def scenario():
+            db = AsyncMongoMockClient()["webhooks"]
+            await seed_orders(db, 1)
+            receiving = make_queue(db, RecordingWebhookEventQueue)
+            assert await receiving.submit(completed_event(0)) is True
+            starting = make_queue(db, RecordingWebhookEventQueue)
+            starting.start()
+            await asyncio.sleep(0.05)
+            await starting.stop()
+            receiving.start()
+            try:
+                assert await wait_until_paid(db, 1)
+            finally:
+                await receiving.stop()
+            return receiving.applied, starting.applied
+
+        receiving, starting = asyncio.run(scenario())
+        assert receiving == ["evt_test_0"] and starting == []
+
+    def test_expired_claim_is_replayed(self):
+        """Test that an event held by a worker that died is replayed once its lease runs out"""
+        async def scenario():
+            db = AsyncMongoMockClient()["webhooks"]
+            await seed_orders(db, 1)
+            await db.webhook_events.insert_one({
+                "_id": "evt_test_0", **completed_event(0), "processed_at": None,
+                "claimed_by": "dead-worker", "claimed_until": datetime.now(timezone.utc) - timedelta(seconds=1),
+            })
+            queue = make_queue(db)
+            queue.start()
+            try:
+                assert await wait_until_paid(db, 1)
+            finally:
+                await queue.stop()
+            return await db.webhook_events.find_one({"_id": "evt_test_0"})
+
+        stored = asyncio.run(scenario())
+        # A date, so the TTL index can expire it
+        assert isinstance(stored["processed_at"], datetime)
+
+
+class TestWebhookEventIndexes:
+    """Applied events expire through a TTL index on processed_at"""
+
+    def test_ttl_index_replaces_plain_index(self):
+        """Test that ensure_indexes drops the old processed_at index and creates the TTL one"""
+        async def scenario():
+            db = AsyncMongoMockClient()["webhooks"]
+            await db.webhook_events.create_indexes([IndexModel([("processed_at", ASCENDING)], name="processed_at")])
+            await ensure_indexes(db)
+            return await db.webhook_events.index_information()
+
+        indexes = asyncio.run(scenario())
+        assert "processed_at" not in indexes
+        assert indexes["processed_at_ttl"]["expireAfterSeconds"] == WEBHOOK_EVENT_RETENTION_SECONDS
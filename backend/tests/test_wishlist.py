@@ -0,0 +1,38 @@
+"""
+Wishlist write tests, run offline by recording the update sent to MongoDB
+"""
+import asyncio
+from types import SimpleNamespace
+
+ITEM = {"product_id": 7, "name": "$5 Tote", "price": 299.0, "image": "https://example.com/7.jpg"}
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.calls = []
+
+    async def update_one(self, query, update, upsert=False):
+        self.calls.append((query, update, upsert))
+
+
+class TestAddToWishlist:
+    """Adding an item is one upsert that appends only missing products"""
+
+    def test_update_appends_only_missing_product(self, server):
+        """Test that the upsert is keyed on user_id and appends the item only when absent"""
+        wishlists = RecordingCollection()
+        db = SimpleNamespace(wishlists=wishlists)
+
+        asyncio.run(server.add_to_wishlist(server.WishlistItem(**ITEM), user={"id": "user-1"}, db=db))
+
+        [(query, update, upsert)] = wishlists.calls
+        assert query == {"user_id": "user-1"} and upsert
+        [stage] = update
+        already_listed = {"$in": [7, {"$ifNull": ["$items.product_id", []]}]}
+        assert stage["$set"]["items"] == {"$cond": [
+            already_listed,
+            "$items",
+            # $literal, so values such as "$5 Tote" aren't read as field paths
+            {"$concatArrays": [{"$ifNull": ["$items", []]}, [{"$literal": ITEM}]]},
+        ]}
+        assert stage["$set"]["updated_at"]["$cond"][:2] == [already_listed, "$updated_at"]
@@ -0,0 +1,88 @@
+"""
+Startup warm-up and the readiness state behind /health/ready.
+
+Each step (Mongo pool, bcrypt backend, catalog, ...) runs in the background
+from startup so the first requests don't pay for cold connections or lazy
+initialization. Steps that fail are retried; the worker reports ready only
+once every step has succeeded, and stops reporting ready when it shuts down.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    def __init__(self, steps: Dict[str, Callable[[], Awaitable[None]]], retry_interval: float = 2.0):
+        self.steps = steps
+        self.retry_interval = retry_interval
+        # step -> None once done, otherwise the last error
+        self.status: Dict[str, Optional[str]] = {name: "pending" for name in steps}
+        self.durations: Dict[str, float] = {}
+        self.stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return not self.stopping and all(error is None for error in self.status.values())
+
+    async def _run_step(self, name: str) -> None:
+        start = time.perf_counter()
+        try:
+            await self.steps[name]()
+        except Exception as e:
+            self.status[name] = str(e) or type(e).__name__
+            logger.error(f"Warm-up step {name} failed: {self.status[name]}")
+        else:
+            self.status[name] = None
+            self.durations[name] = time.perf_counter() - start
+
+    async def run_once(self) -> bool:
+        """Run every step not done yet, concurrently; returns whether all are done."""
+        await asyncio.gather(*[self._run_step(name) for name, error in self.status.items() if error is not None])
+        return self.ready
+
+    async def _run(self) -> None:
+        attempts = 1
+        while not await self.run_once():
+            attempts += 1
+            await asyncio.sleep(self.retry_interval)
+        logger.info(f"Worker warm after {attempts} attempt(s): {self.durations}")
+
+    def start(self) -> None:
+        """Run every step in the background, retrying failures until all succeed.
+
+        Startup doesn't wait on it, so an unreachable dependency can't hold up
+        the worker; /health/ready reports not ready until it's done.
+        """
+        self.stopping = False
+        if self._task is None or self._task.done():
+            self.status = {name: "pending" for name in self.steps}
+            self.durations = {}
+            self._task = asyncio.create_task(self._run())
+
+    async def wait(self) -> None:
+        """Until the warm-up has finished or been stopped."""
+        if self._task is not None:
+            await asyncio.wait([self._task])
+
+    async def stop(self) -> None:
+        self.stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "steps": {
+                name: {"ok": error is None, "error": error, "seconds": round(self.durations.get(name, 0.0), 4)}
+                for name, error in self.status.items()
+            },
+        }
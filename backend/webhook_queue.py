@@ -0,0 +1,173 @@
+"""
+Stripe webhook ingestion: persist, acknowledge, apply later in batches.
+
+`submit` records a verified event in the `webhook_events` collection keyed by
+its Stripe event id (so retries of an applied event are dropped) and queues
+it; the route can answer Stripe right away. A single consumer task drains the
+queue and applies the order/payment_transaction updates with one `bulk_write`
+per collection per batch. A batch that fails is retried with backoff until it
+applies, a retried event that is stored but not yet applied is queued again,
+and events still unprocessed when a worker stops are replayed from the store
+on the next start.
+
+Stored events carry a lease (`claimed_until`): the submitting worker holds it
+while the event waits in its queue, and a replaying worker takes it per batch
+(`claimed_by`), so workers starting together split a backlog rather than each
+applying all of it. Leases expire, so events held by a worker that died are
+picked up by the next one to start.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Event fields handed to _apply
+EVENT_PROJECTION = {"_id": 0, "event_id": 1, "event_type": 1, "session_id": 1, "payment_status": 1}
+
+
+class WebhookEventQueue:
+    def __init__(
+        self,
+        db,
+        maxsize: int,
+        batch_size: int,
+        flush_interval: float,
+        retry_initial: float = 1.0,
+        retry_max: float = 60.0,
+        claim_lease: float = 300.0,
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self.claim_lease = claim_lease
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._consumer: Optional[asyncio.Task] = None
+
+    async def submit(self, event: dict) -> bool:
+        """Store and queue an event; returns False if it was already applied."""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.db.webhook_events.insert_one({
+                "_id": event["event_id"],
+                **event,
+                "received_at": now.isoformat(),
+                # Held while it waits in this worker's queue, so a worker starting now doesn't replay it
+                "claimed_until": now + timedelta(seconds=self.claim_lease),
+                "processed_at": None,
+            })
+        except DuplicateKeyError:
+            stored = await self.db.webhook_events.find_one({"_id": event["event_id"]}, {"processed_at": 1})
+            if stored is None or stored.get("processed_at") is not None:
+                return False
+            # Received before but not applied yet (a failing batch, or a worker that
+            # stopped first); applying twice is harmless, losing the event is not
+        await self._queue.put(event)
+        return True
+
+    async def _apply(self, batch: List[dict]) -> None:
+        now = datetime.now(timezone.utc)
+        updates = [
+            UpdateOne(
+                {"session_id": event["session_id"]},
+                {"$set": {
+                    "status": "completed",
+                    "payment_status": event["payment_status"],
+                    "updated_at": now.isoformat()
+                }}
+            )
+            for event in batch
+        ]
+        # Ordered, so several events for one session apply in arrival order
+        await self.db.payment_transactions.bulk_write(updates, ordered=True)
+        await self.db.orders.bulk_write(updates, ordered=True)
+        await self.db.webhook_events.update_many(
+            {"_id": {"$in": [event["event_id"] for event in batch]}},
+            # A date, not an ISO string: the TTL index on processed_at expires applied events
+            {"$set": {"processed_at": now}}
+        )
+
+    async def _next_batch(self) -> List[dict]:
+        batch = [await self._queue.get()]
+        # Let a burst of events join this batch. Not wait_for(queue.get()), which on
+        # Python 3.11 can lose a queue wakeup when its timeout races a put
+        if self._queue.qsize() < self.batch_size - 1:
+            await asyncio.sleep(self.flush_interval)
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _apply_with_retry(self, batch: List[dict]) -> None:
+        # Later events wait behind a failing batch; they couldn't apply while MongoDB is failing anyway
+        delay = self.retry_initial
+        while True:
+            try:
+                await self._apply(batch)
+                return
+            except Exception as e:
+                logger.error(f"Applying {len(batch)} webhook events failed, retrying in {delay:.1f}s: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max)
+
+    async def _claim_batch(self) -> Tuple[int, List[dict]]:
+        """Lease up to batch_size unprocessed events nobody holds.
+
+        Returns how many unheld events were found and those this worker got;
+        another worker may take some of them between the find and the update.
+        """
+        now = datetime.now(timezone.utc)
+        unheld = {"processed_at": None, "$or": [{"claimed_until": None}, {"claimed_until": {"$lt": now}}]}
+        found = [doc["_id"] for doc in await self.db.webhook_events.find(unheld, {"_id": 1}).to_list(self.batch_size)]
+        if not found:
+            return 0, []
+        claim = uuid.uuid4().hex
+        await self.db.webhook_events.update_many(
+            {"_id": {"$in": found}, **unheld},
+            {"$set": {"claimed_by": claim, "claimed_until": now + timedelta(seconds=self.claim_lease)}}
+        )
+        claimed = self.db.webhook_events.find({"_id": {"$in": found}, "claimed_by": claim}, EVENT_PROJECTION)
+        return len(found), await claimed.to_list(None)
+
+    async def _replay(self) -> None:
+        replayed = 0
+        delay = self.retry_initial
+        while True:
+            try:
+                found, batch = await self._claim_batch()
+            except Exception as e:
+                logger.error(f"Replaying webhook events failed, retrying in {delay:.1f}s: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max)
+                continue
+            if not found:
+                break
+            if batch:
+                await self._apply_with_retry(batch)
+                replayed += len(batch)
+        if replayed:
+            logger.info(f"Replayed {replayed} unprocessed webhook events")
+
+    async def _consume(self) -> None:
+        await self._replay()
+        while True:
+            await self._apply_with_retry(await self._next_batch())
+
+    def start(self) -> None:
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self) -> None:
+        if self._consumer is not None:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
@@ -8,6 +8,8 @@ const AccountPage = ({ isOpen, onClose }) => {
   const { user, token, logout, updateProfile, authFetch } = useAuth();
   const [activeTab, setActiveTab] = useState('profile');
   const [orders, setOrders] = useState([]);
+  const [ordersCursor, setOrdersCursor] = useState(null);
+  const [loadingMoreOrders, setLoadingMoreOrders] = useState(false);
   const [wishlist, setWishlist] = useState([]);
   const [addresses, setAddresses] = useState([]);
   const [loading, setLoading] = useState(false);
@@ -32,6 +34,7 @@ const AccountPage = ({ isOpen, onClose }) => {
         const res = await authFetch(`${API_URL}/api/orders`);
         const data = await res.json();
         setOrders(data.orders || []);
+        setOrdersCursor(data.next_cursor || null);
       } else if (activeTab === 'wishlist') {
         const res = await authFetch(`${API_URL}/api/wishlist`);
         const data = await res.json();
@@ -70,6 +73,21 @@ const AccountPage = ({ isOpen, onClose }) => {
     }
   };
 
+  const loadMoreOrders = async () => {
+    if (!ordersCursor) return;
+    setLoadingMoreOrders(true);
+    try {
+      const res = await authFetch(`${API_URL}/api/orders?cursor=${encodeURIComponent(ordersCursor)}`);
+      const data = await res.json();
+      setOrders((prev) => [...prev, ...(data.orders || [])]);
+      setOrdersCursor(data.next_cursor || null);
+    } catch (error) {
+      console.error('Error loading more orders:', error);
+    } finally {
+      setLoadingMoreOrders(false);
+    }
+  };
+
   const handleAddAddress = async (e) => {
     e.preventDefault();
     try {
@@ -301,6 +319,11 @@ const AccountPage = ({ isOpen, onClose }) => {
                                   </div>
                                 </div>
                               ))}
+                              {order.items_count > (order.items?.length || 0) && (
+                                <p className="text-sm text-gray-500 self-center">
+                                  +{order.items_count - (order.items?.length || 0)} more items
+                                </p>
+                              )}
                             </div>
                             <div className="mt-4 pt-4 border-t border-gray-100 flex justify-between">
                               <span className="font-medium">Total</span>
@@ -308,6 +331,16 @@ const AccountPage = ({ isOpen, onClose }) => {
                             </div>
                           </div>
                         ))}
+                        {ordersCursor && (
+                          <button
+                            onClick={loadMoreOrders}
+                            disabled={loadingMoreOrders}
+                            data-testid="load-more-orders"
+                            className="w-full py-3 border border-gray-300 rounded-lg font-medium hover:bg-gray-50 disabled:opacity-50"
+                          >
+                            {loadingMoreOrders ? 'Loading...' : 'Load more orders'}
+                          </button>
+                        )}
                       </div>
                     )}
                   </div>